@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Whale balance providers: batched ERC-20 balanceOf over JSON-RPC, with the DeBank scraper as fallback."""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+
+import scrap
+
+BALANCE_OF_SELECTOR = "0x70a08231"  # keccak256("balanceOf(address)")[:4]
+
+
+class BalanceProvider(ABC):
+    """Reads token balances for a list of wallets.
+
+    get_balances() returns a dict mapping each wallet to its balance, or to
+    None when this provider could not read it.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def get_balances(self, wallets):
+        pass
+
+
+class JsonRpcBalanceProvider(BalanceProvider):
+    """ERC-20 balanceOf for many wallets in a single JSON-RPC batch request."""
+
+    name = "jsonrpc"
+
+    def __init__(self, rpc_url, token_address, get_client, decimals=18):
+        self.rpc_url = rpc_url
+        self.token_address = token_address
+        self.get_client = get_client
+        self.decimals = decimals
+
+    def balance_of_call(self, request_id, wallet):
+        data = BALANCE_OF_SELECTOR + wallet.lower().removeprefix("0x").rjust(64, "0")
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "eth_call",
+            "params": [{"to": self.token_address, "data": data}, "latest"],
+        }
+
+    async def get_balances(self, wallets):
+        batch = [self.balance_of_call(i, wallet) for i, wallet in enumerate(wallets)]
+        # The shared client's timeouts apply, including its connect timeout
+        resp = await self.get_client().post(self.rpc_url, json=batch)
+        resp.raise_for_status()
+        results = resp.json()
+        if isinstance(results, dict):
+            # Some nodes answer a failed batch with a single error object
+            raise ValueError(f"JSON-RPC batch failed: {results.get('error')}")
+
+        # Batch responses may come back in any order
+        by_id = {r.get("id"): r for r in results}
+        balances = {}
+        for i, wallet in enumerate(wallets):
+            result = by_id.get(i, {}).get("result")
+            try:
+                balances[wallet] = int(result, 16) / 10 ** self.decimals
+            except (TypeError, ValueError):
+                balances[wallet] = None
+        return balances
+
+
+class SeleniumBalanceProvider(BalanceProvider):
+    """The DeBank scraper; only knows the single wallet scrap.py is pointed at."""
+
+    name = "selenium"
+
+    def __init__(self, deadline_ses):
+        self.deadline_ses = deadline_ses
+
+    async def get_balances(self, wallets):
+        balances = {wallet: None for wallet in wallets}
+        if scrap.WALLET.lower() not in (w.lower() for w in wallets):
+            return balances
+
+        # Run the blocking Selenium scraper on its own bounded executor (one thread per pooled browser)
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.deadline_ses
+        result = await asyncio.wait_for(
+            loop.run_in_executor(scrap.BROWSER_EXECUTOR, scrap.get_gns_amount, deadline),
+            self.deadline_ses
+        )
+        for wallet in wallets:
+            if wallet.lower() == scrap.WALLET.lower() and result is not None:
+                balances[wallet] = float(result)
+        return balances
+
+
+class FallbackBalanceProvider(BalanceProvider):
+    """Ask providers in order; later ones only fill wallets earlier ones missed."""
+
+    name = "fallback"
+
+    def __init__(self, providers):
+        self.providers = providers
+
+    async def get_balances(self, wallets):
+        balances = {wallet: None for wallet in wallets}
+        for provider in self.providers:
+            missing = [w for w in wallets if balances[w] is None]
+            if not missing:
+                break
+            try:
+                balances.update(await provider.get_balances(missing))
+            except Exception as e:
+                print(f"Balance provider {provider.name} failed: {e!r}")
+        return balances
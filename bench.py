@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the boss renderers, the leaderboard and the burn commands.
+
+Every case is checked once for sane output and then timed with timeit.
+Results are written as JSON so runs from different releases can be compared:
+
+    python bench.py                                  # writes bench_results.json
+    python bench.py --compare old.json               # also flags regressions
+    python bench.py --only burn --output /tmp/b.json
+
+Handlers run against a stub /stats backend (httpx.MockTransport) and a
+throwaway state directory, so no token, network or live data is needed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench")
+
+REPEAT = 5  # timeit repetitions per case; the best one is reported
+MIN_RUN_SES = 0.2  # each repetition runs at least this long
+REGRESSION_RATIO = 1.25  # --compare flags cases this much slower than before
+STATS_DAYS = 2 * 366
+STATS_ENTRIES_PER_DAY = 4
+LEADERBOARD_SIZES = (10, 1_000, 100_000)
+
+# gmud opens its state and supply files in the working directory
+WORK_DIR = tempfile.mkdtemp(prefix="gmud-bench-")
+os.chdir(WORK_DIR)
+
+import httpx
+import gmud
+from outbox import Outbox
+from storage import JsonStore
+from supply_history import SupplyHistory
+
+
+# ---------------------------------------------------
+# Fixtures
+# ---------------------------------------------------
+
+def make_stats(days=STATS_DAYS, per_day=STATS_ENTRIES_PER_DAY):
+    """A /stats payload shaped like the backend's: unordered, several entries per day."""
+    now = datetime.now(timezone.utc)
+    entries = []
+    for day in range(days):
+        for i in range(per_day):
+            dt = now - timedelta(days=day, hours=i * 24 // per_day)
+            entries.append({
+                "date": dt.isoformat().replace("+00:00", "Z"),
+                "token_supply": 27_000_000 + day * 1_000 + i * 7,
+            })
+    # The API does not guarantee ordering
+    entries.reverse()
+    entries[::2], entries[1::2] = entries[1::2], entries[::2]
+    return entries
+
+
+STATS = make_stats()
+
+
+def stats_handler(request):
+    return httpx.Response(200, json={"stats": STATS})
+
+
+class BenchMessage:
+    """Just enough of aiogram's Message for the command handlers."""
+
+    def __init__(self, text, user="Bench User"):
+        self.text = text
+        # Dated after BOT_START_TIME so the handlers don't drop it as stale
+        self.date = datetime.now(timezone.utc) + timedelta(hours=1)
+        self.chat = SimpleNamespace(username=gmud.ALLOWED_CHAT_USERNAME, id=-1, type="supergroup")
+        self.from_user = SimpleNamespace(full_name=user, first_name=user, username=user, id=1)
+        self.message_id = 1
+        self.replies = []
+
+    async def reply(self, text, **kwargs):
+        self.replies.append(text)
+        return SimpleNamespace(message_id=2, chat=self.chat)
+
+
+def make_game_state(num_players):
+    """A GameState loaded from a snapshot holding num_players players."""
+    path = os.path.join(WORK_DIR, f"players_{num_players}")
+    data = gmud.new_data()
+    data['players'] = {
+        f"Player {i}": {"damage": (i * 7_919) % 5_000_000, "last_attack": None}
+        for i in range(num_players)
+    }
+    data['players']["Bench User"] = {"damage": 1_234_567, "last_attack": None}
+    with open(path + ".json", "w") as f:
+        json.dump(data, f)
+    return gmud.GameState(JsonStore(path + ".json", path + ".jsonl"))
+
+
+# ---------------------------------------------------
+# Runner
+# ---------------------------------------------------
+
+def time_case(fn):
+    """Time fn and return (best, median) seconds per call and the loop count."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= MIN_RUN_SES:
+            break
+        number *= 2
+    runs = [t / number for t in timer.repeat(repeat=REPEAT, number=number)]
+    return min(runs), statistics.median(runs), number
+
+
+def check_frame(frame):
+    lines = frame.split("\n")
+    assert lines[0] == lines[-1] == "-" * 29, "frame must start and end with a border"
+    assert all(len(line) <= 29 for line in lines), "frame lines must fit in 29 characters"
+
+
+def run_handler(loop, handler, text):
+    message = BenchMessage(text)
+    loop.run_until_complete(handler(message))
+    loop.run_until_complete(gmud.OUTBOX.drain())
+    return message.replies
+
+
+def build_cases(loop):
+    """Return (name, group, fn, check) for every benchmark case."""
+    cases = []
+    damages = [[41_880, "Very Long Nickname Here"], [0, "Miss User"], [2_500, ""]]
+
+    stage_supplies = {
+        "serpent": 24_999_999,
+        "serpent_rising": 25_000_000,
+        "dragonlord_rising": 26_000_000,
+        "dragonlord": 27_000_000,
+    }
+    for stage, supply in stage_supplies.items():
+        for crossed in (False, True):
+            args = (supply, tuple(map(tuple, damages)), 9_999, crossed)
+            name = f"render_supplarius[{stage}{',crossed' if crossed else ''}]"
+            # Uncached render, then the same frame served from the render cache
+            cases.append((name, "render", lambda a=args: gmud.render_supplarius.__wrapped__(*a), check_frame))
+            cases.append((
+                name.replace("render_", "format_"),
+                "render",
+                lambda s=supply, c=crossed: gmud.format_supplarius(s, damages, "x", 9_999, {}, crossed_million=c),
+                check_frame,
+            ))
+
+    for label, kwargs in (("partial", {}), ("full", {"show_full": True}), ("defeated", {"defeated": True})):
+        args = (123_456, tuple(map(tuple, damages)), 5, kwargs.get("defeated", False))
+        cases.append((f"render_whale[{label}]", "render", lambda a=args: gmud.render_whale.__wrapped__(*a), check_frame))
+        cases.append((
+            f"format_whale[{label}]",
+            "render",
+            lambda k=kwargs: gmud.format_whale(123_456.78, damages, "x", 4_321, {}, **k),
+            check_frame,
+        ))
+
+    for size in LEADERBOARD_SIZES:
+        state = make_game_state(size)
+
+        def gmud_page(state=state, text="/gmud"):
+            gmud.SHARDS.shards[gmud.ALLOWED_CHAT_USERNAME] = gmud.ChatShard(gmud.ALLOWED_CHAT_USERNAME, state)
+            return run_handler(loop, gmud.handle_gmud_command, text)
+
+        def check_page(replies, size=size):
+            assert len(replies) == 1 and "Your rank:" in replies[0], replies
+            assert len(replies[0]) <= gmud.TELEGRAM_MESSAGE_LIMIT
+
+        cases.append((f"handle_gmud[{size} players]", "leaderboard", gmud_page, check_page))
+        cases.append((
+            f"handle_gmud[{size} players,me]", "leaderboard",
+            lambda state=state: gmud_page(state, "/gmud me"), check_page,
+        ))
+
+    # The lookups /burn makes: the local series first, the parsed history as its fallback
+    history = SupplyHistory(STATS)
+    series = gmud.get_supply_series()
+    series.sync(history.records)
+    today = datetime.now(timezone.utc).date()
+    for days_ago in (0, 30, 365):
+        target = today - timedelta(days=days_ago)
+
+        def check_entry(entry, target=target):
+            assert entry is not None and entry["date"].startswith(target.isoformat()), entry
+
+        def check_supply(supply, target=target):
+            assert supply is not None and supply == history.supply_on(target), supply
+
+        cases.append((
+            f"latest_for_date[{days_ago}d ago,{len(STATS)} entries]", "burn",
+            lambda t=target: history.latest_for_date(t), check_entry,
+        ))
+        cases.append((
+            f"series_supply_on[{days_ago}d ago,{len(series)} days]", "burn",
+            lambda t=target: series.supply_on(t), check_supply,
+        ))
+
+    def check_burn(replies):
+        assert len(replies) == 1 and "Tot" in replies[0] and "No data" not in replies[0], replies
+
+    def check_burnt(replies):
+        assert len(replies) == 1 and "365d" in replies[0] and "No data" not in replies[0], replies
+
+    cases.append(("burn[/burn 1y]", "burn",
+                  lambda: run_handler(loop, gmud.handle_burn_command, "/burn 1y"), check_burn))
+    cases.append(("burnt[/burnt 1d,7d,30d,365d]", "burn",
+                  lambda: run_handler(loop, gmud.handle_burnt_command, "/burnt 1d,7d,30d,365d"), check_burnt))
+    return cases
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print per-case ratios against a previous results file; return the regressed names."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = result["best_us"] / old["best_us"]
+        flag = ""
+        if ratio > REGRESSION_RATIO:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<52} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results.json"))
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--only", help="run only cases whose group or name contains this")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    gmud.http_client = httpx.AsyncClient(transport=httpx.MockTransport(stats_handler))
+    # Time the handlers, not Telegram's flood limits
+    unlimited = float("inf")
+    gmud.OUTBOX = Outbox(unlimited, unlimited, unlimited, unlimited, unlimited, gmud.OUTBOX_MAX_QUEUE, 0)
+
+    results = {}
+    try:
+        for name, group, fn, check in build_cases(loop):
+            if args.only and args.only not in group and args.only not in name:
+                continue
+            check(fn())
+            best, median, number = time_case(fn)
+            results[name] = {
+                "group": group,
+                "best_us": round(best * 1e6, 3),
+                "median_us": round(median * 1e6, 3),
+                "loops": number,
+            }
+            print(f"  {name:<52} {best * 1e6:12.1f} us  (median {median * 1e6:.1f} us, {number} loops)")
+    finally:
+        loop.run_until_complete(gmud.OUTBOX.stop())
+        loop.run_until_complete(gmud.close_http_client())
+        gmud.close_supply_series()
+        loop.close()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed by more than {REGRESSION_RATIO}x")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark /burn 5y: linear rescans vs date index, and the per-period loop vs NumPy."""
+
+import sys
+import time
+sys.path.insert(0, '.')
+
+from datetime import datetime, timezone, timedelta
+from supply_history import SupplyHistory
+import numpy as np
+import burn_analytics
+
+YEARS = 5
+ENTRIES_PER_DAY = 4
+
+now = datetime.now(timezone.utc)
+days = YEARS * 366
+entries = []
+for day in range(days):
+    for i in range(ENTRIES_PER_DAY):
+        dt = now - timedelta(days=day, hours=i * 6)
+        entries.append({
+            "date": dt.isoformat().replace("+00:00", "Z"),
+            "token_supply": 27_000_000 + day * 1_000 + i,
+        })
+
+print(f"{len(entries)} entries, {days} periods (2 lookups each, like daily /burn)")
+
+
+def get_latest_entry_for_date(entries, target_date):
+    """The latest entry on target_date by rescanning every entry, as /burn used to."""
+    latest_entry = None
+    latest_dt = None
+
+    for e in entries:
+        date_str = e.get("date")
+        if not date_str:
+            continue
+
+        entry_dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+
+        if entry_dt.date() != target_date:
+            continue
+
+        if latest_dt is None or entry_dt > latest_dt:
+            latest_dt = entry_dt
+            latest_entry = e
+
+    return latest_entry
+
+periods = list(range(days))
+
+
+def linear_lookups():
+    results = []
+    for d in periods:
+        target_date = (now - timedelta(days=d)).date()
+        target_date_before = (now - timedelta(days=d + 1)).date()
+        results.append((
+            get_latest_entry_for_date(entries, target_date),
+            get_latest_entry_for_date(entries, target_date_before),
+        ))
+    return results
+
+
+def indexed_lookups():
+    history = SupplyHistory(entries)
+    results = []
+    for d in periods:
+        target_date = (now - timedelta(days=d)).date()
+        target_date_before = (now - timedelta(days=d + 1)).date()
+        results.append((
+            history.latest_for_date(target_date),
+            history.latest_for_date(target_date_before),
+        ))
+    return results
+
+
+start = time.perf_counter()
+linear = linear_lookups()
+linear_time = time.perf_counter() - start
+
+start = time.perf_counter()
+indexed = indexed_lookups()
+indexed_time = time.perf_counter() - start
+
+assert linear == indexed, "indexed lookups differ from linear scan"
+
+print(f"  linear scan:           {linear_time * 1000:10.1f} ms")
+print(f"  indexed (incl. parse): {indexed_time * 1000:10.1f} ms")
+print(f"  speedup:               {linear_time / indexed_time:10.1f}x")
+
+
+# --- daily burn statistics: per-period loop vs vectorized ---
+history = SupplyHistory(entries)
+today = now.date()
+
+
+def loop_burns():
+    burns = []
+    total = 0
+    for d in periods:
+        day = history.supply_on(today - timedelta(days=d))
+        day_before = history.supply_on(today - timedelta(days=d + 1))
+        if day is None or day_before is None:
+            continue
+        burned = day_before - day
+        burns.append(burned)
+        total += burned
+    return burns, total
+
+
+def vectorized_burns():
+    closes = burn_analytics.dense_closes(*history.daily_closes(), today.toordinal())
+    result = burn_analytics.daily_burns(closes, np.array(periods, dtype=np.int64))
+    return result.burned[result.valid].tolist(), result.total
+
+
+start = time.perf_counter()
+loop = loop_burns()
+loop_time = time.perf_counter() - start
+
+start = time.perf_counter()
+vectorized = vectorized_burns()
+vectorized_time = time.perf_counter() - start
+
+assert loop == vectorized, "vectorized burns differ from the loop"
+
+print(f"  per-period loop:       {loop_time * 1000:10.2f} ms")
+print(f"  vectorized:            {vectorized_time * 1000:10.2f} ms")
+print(f"  speedup:               {loop_time / vectorized_time:10.1f}x")
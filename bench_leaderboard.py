@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark leaderboard queries with 100k synthetic players (full sort vs incremental ranking)."""
+
+import random
+import sys
+import time
+sys.path.insert(0, '.')
+
+from leaderboard import Leaderboard
+
+NUM_PLAYERS = 100_000
+NUM_ATTACKS = 200
+
+random.seed(42)
+players = {f"Player{i}": {"damage": random.randint(0, 5_000_000), "last_attack": None} for i in range(NUM_PLAYERS)}
+attacks = [(f"Player{random.randrange(NUM_PLAYERS)}", random.randint(1, 50_000)) for _ in range(NUM_ATTACKS)]
+
+print(f"{NUM_PLAYERS} players, {NUM_ATTACKS} attacks, each followed by a top-3 and rank query")
+
+
+def sorted_queries():
+    results = []
+    for name, damage in attacks:
+        players[name]['damage'] += damage
+        ranked = sorted(players.items(), key=lambda x: x[1]['damage'], reverse=True)
+        top3 = [(n, p['damage']) for n, p in ranked[:3]]
+        rank = next(i for i, (n, _) in enumerate(ranked, start=1) if n == name)
+        results.append((top3, rank))
+    return results
+
+
+def leaderboard_queries(leaderboard):
+    results = []
+    for name, damage in attacks:
+        players[name]['damage'] += damage
+        leaderboard.update(name, players[name]['damage'])
+        results.append((leaderboard.top(3), leaderboard.rank(name)))
+    return results
+
+
+initial = {name: dict(p) for name, p in players.items()}
+
+start = time.perf_counter()
+expected = sorted_queries()
+sorted_time = time.perf_counter() - start
+
+players = {name: dict(p) for name, p in initial.items()}
+start = time.perf_counter()
+leaderboard = Leaderboard(players)
+build_time = time.perf_counter() - start
+
+start = time.perf_counter()
+actual = leaderboard_queries(leaderboard)
+leaderboard_time = time.perf_counter() - start
+
+assert actual == expected, "leaderboard results differ from full sort"
+
+print(f"  full sort per query:   {sorted_time * 1000:10.1f} ms ({sorted_time / NUM_ATTACKS * 1e6:8.1f} us/attack)")
+print(f"  leaderboard build:     {build_time * 1000:10.1f} ms (once at startup)")
+print(f"  leaderboard updates:   {leaderboard_time * 1000:10.1f} ms ({leaderboard_time / NUM_ATTACKS * 1e6:8.1f} us/attack)")
+print(f"  speedup:               {sorted_time / leaderboard_time:10.1f}x")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Vectorized burn statistics over a daily-close supply series."""
+from collections import namedtuple
+
+import numpy as np
+
+# integral marks rows whose inputs were all whole numbers, so they can be shown as ints
+DailyBurns = namedtuple(
+    "DailyBurns", ["valid", "integral", "burned", "pct", "count", "total", "total_pct", "max_index"]
+)
+CumulativeBurns = namedtuple("CumulativeBurns", ["valid", "integral", "old_supply", "burned", "pct"])
+
+
+def dense_closes(ordinals, supplies, today_ordinal):
+    """Array where index d holds the daily close d days before today, NaN where there is no data.
+
+    Args:
+        ordinals: ascending date ordinals of the stored daily closes
+        supplies: the matching closing supplies
+        today_ordinal: date.toordinal() of today (UTC)
+    """
+    ordinals = np.array(ordinals, dtype=np.int64)
+    supplies = np.array(supplies, dtype=np.float64)
+    if not len(ordinals):
+        return np.full(0, np.nan)
+    days_ago = today_ordinal - ordinals
+    closes = np.full(max(int(days_ago.max()) + 1, 0), np.nan)
+    in_range = days_ago >= 0
+    closes[days_ago[in_range]] = supplies[in_range]
+    return closes
+
+
+def closes_at(closes, days):
+    """Closes for an array of days-ago values; NaN beyond the stored history."""
+    result = np.full(len(days), np.nan)
+    inside = days < len(closes)
+    result[inside] = closes[days[inside]]
+    return result
+
+
+def is_integral(values):
+    """Mask of values that are whole numbers (False for NaN)."""
+    return np.floor(values) == values
+
+
+def _percent(burned, base):
+    pct = np.zeros_like(burned)
+    np.divide(burned, base, out=pct, where=base > 0)
+    return pct * 100
+
+
+def daily_burns(closes, days):
+    """Burn on each requested day: close of the day before minus close of that day.
+
+    Totals are accumulated in period order (cumsum) so they match a plain
+    Python loop bit for bit. max_index is the first period with the largest
+    positive burn, or None.
+    """
+    supply_day = closes_at(closes, days)
+    supply_day_before = closes_at(closes, days + 1)
+    valid = ~(np.isnan(supply_day) | np.isnan(supply_day_before))
+    integral = is_integral(supply_day) & is_integral(supply_day_before)
+
+    burned = np.where(valid, supply_day_before - supply_day, 0.0)
+    pct = np.where(valid, _percent(burned, np.where(valid, supply_day_before, 0.0)), 0.0)
+
+    count = int(valid.sum())
+    total = np.cumsum(burned[valid])[-1] if count else 0.0
+    total_pct = np.cumsum(pct[valid])[-1] if count else 0.0
+
+    max_index = None
+    if count:
+        candidates = np.where(valid, burned, -np.inf)
+        i = int(np.argmax(candidates))
+        if candidates[i] > 0:
+            max_index = i
+
+    return DailyBurns(valid, integral, burned, pct, count, float(total), float(total_pct), max_index)
+
+
+def cumulative_burns(closes, days, today_supply):
+    """Burn from the close of each requested day until today's supply."""
+    old_supply = closes_at(closes, days)
+    valid = ~np.isnan(old_supply)
+    integral = is_integral(old_supply)
+    old_supply = np.where(valid, old_supply, 0.0)
+    burned = np.where(valid, old_supply - today_supply, 0.0)
+    pct = np.where(valid, _percent(burned, old_supply), 0.0)
+    return CumulativeBurns(valid, integral, old_supply, burned, pct)
+
+
+def visible_rows(count, max_lines):
+    """Row indices that survive truncation: all of them, or the first and last halves.
+
+    Returns:
+        (head indices, tail indices); tail is empty when nothing is truncated
+    """
+    if count <= max_lines:
+        return range(count), range(0)
+    first_count = max_lines // 2
+    last_count = max_lines - first_count
+    return range(first_count), range(count - last_count, count)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Circuit breaker for an upstream endpoint."""
+import time
+
+import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint once it is known to be failing.
+
+    After failure_threshold consecutive failures the circuit opens and
+    allow() refuses every call for reset_ses. Then a single trial call is
+    let through (half-open): success closes the circuit, failure opens it
+    for another reset_ses.
+    """
+
+    def __init__(self, name, failure_threshold, reset_ses):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_ses = reset_ses
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def retry_in(self):
+        """Seconds until an open circuit lets a trial call through (0 if not open)."""
+        if self.state != OPEN:
+            return 0
+        return max(0, self.opened_at + self.reset_ses - time.monotonic())
+
+    def allow(self):
+        if self.state == OPEN and self.retry_in() == 0:
+            self.state = HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        metrics.inc("circuit_rejected_total", circuit=self.name)
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"Circuit {self.name} open after {self.failures} failures, retrying in {self.reset_ses}s")
+                metrics.inc("circuit_opened_total", circuit=self.name)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
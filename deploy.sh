@@ -10,7 +10,7 @@ SERVICE_NAME="gmud"
 # 1. Sync all files (including .env)
 # ---------------------------
 echo "📤 Syncing project files..."
-rsync -avz --exclude ".env" --exclude "gmud_data.json" --exclude ".git" --exclude "venv" --exclude "__pycache__" ./ $REMOTE_USER@$REMOTE_HOST:$REMOTE_DIR
+rsync -avz --exclude ".env" --exclude "gmud_data.json" --exclude "gmud_journal.jsonl" --exclude "gmud_data.sqlite3*" --exclude "gmud_supply*.bin" --exclude "gmud_chats" --exclude "bench_results.json" --exclude ".git" --exclude "venv" --exclude "__pycache__" ./ $REMOTE_USER@$REMOTE_HOST:$REMOTE_DIR
 
 # ---------------------------
 # 2. Install Python dependencies system-wide + Firefox + geckodriver
@@ -20,7 +20,7 @@ set -e
 cd ~/gmud
 
 sudo apt update
-sudo apt install -y python3-pip python3-httpx python3-requests python3-dotenv python3-dateutil wget bzip2 ca-certificates
+sudo apt install -y python3-pip python3-httpx python3-h2 python3-requests python3-dotenv python3-dateutil python3-numpy wget bzip2 ca-certificates
 
 pip3 install --break-system-packages aiogram selenium
 
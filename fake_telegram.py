@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Drive the bot's webhook mode with a local fake Telegram.
+
+A stub Bot API server records the bot's API calls, and updates are
+POSTed to the bot's webhook the way Telegram would send them. The script
+checks the secret-token verification, measures update-to-reply latency
+for /burn against a stub /stats backend, checks that replies are paced,
+prioritized and retried after a flood-limit (429) answer, and that the
+live board is posted, pinned and edited once per burst of /sup attacks.
+No network or real token needed.
+"""
+
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+NUM_UPDATES = 50
+GROUP_CHAT_ID = -100123
+FLOOD_CHAT_ID = 777  # The fake API answers this chat's first message with a 429
+FLOOD_RETRY_AFTER = 1
+SECRET = "fake-telegram-secret"
+TOKEN = "123456:fake-telegram-token"
+
+os.environ.update({
+    "TELEGRAM_BOT_TOKEN": TOKEN,
+    "GMUD_MODE": "webhook",
+    "WEBHOOK_SECRET": SECRET,
+    "WEBHOOK_HOST": "127.0.0.1",
+    "WEBHOOK_PORT": "18080",
+    "METRICS_PORT": "0",
+})
+# gmud keeps its state files in the working directory
+os.chdir(tempfile.mkdtemp(prefix="gmud-fake-telegram-"))
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone, timedelta
+from aiohttp import web
+import httpx
+from types import SimpleNamespace
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+from live_board import LiveBoard
+from outbox import Outbox, PRIORITY_RESULT, PRIORITY_NOTICE
+
+api_calls = []
+replied = {}  # message_id -> time the reply reached the fake API
+flooded = set()
+
+
+async def bot_api(request):
+    """Answer Bot API calls the way api.telegram.org does, recording them."""
+    method = request.match_info["method"]
+    params = dict(await request.post())
+    api_calls.append((method, params))
+    if method == "sendMessage":
+        chat_id = int(params["chat_id"])
+        if chat_id == FLOOD_CHAT_ID and chat_id not in flooded:
+            flooded.add(chat_id)
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {FLOOD_RETRY_AFTER}",
+                "parameters": {"retry_after": FLOOD_RETRY_AFTER},
+            }, status=429)
+        if "reply_parameters" in params:
+            replied[json.loads(params["reply_parameters"])["message_id"]] = time.perf_counter()
+        elif "reply_to_message_id" in params:
+            replied[int(params["reply_to_message_id"])] = time.perf_counter()
+        result = {
+            "message_id": 10_000 + len(api_calls),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+            "text": params["text"],
+        }
+    else:
+        result = True
+    return web.json_response({"ok": True, "result": result})
+
+
+def make_stats():
+    now = datetime.now(timezone.utc)
+    return [
+        {"date": (now - timedelta(days=d, hours=h)).isoformat().replace("+00:00", "Z"),
+         "token_supply": 27_000_000 + d * 1_000 + h}
+        for d in range(60) for h in (0, 12)
+    ]
+
+
+STATS = make_stats()
+
+
+def make_update(update_id, text, chat_id=GROUP_CHAT_ID, first_name="Fake"):
+    if chat_id < 0:
+        chat = {"id": chat_id, "type": "supergroup", "username": "GainsPriceChat"}
+    else:
+        chat = {"id": chat_id, "type": "private"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            # Telegram dates have one-second resolution; stay clear of BOT_START_TIME
+            "date": int(time.time()) + 1,
+            "chat": chat,
+            "from": {"id": 42, "is_bot": False, "first_name": first_name},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        },
+    }
+
+
+async def wait_for_replies(count, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while len(replied) < count and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    assert len(replied) >= count, f"only {len(replied)} of {count} updates answered"
+
+
+async def check_priority():
+    """A chat out of budget gets its attack result before an earlier cooldown notice."""
+    outbox = Outbox(10, 10, 1, 100, 100, 10, 0)
+    order = []
+
+    async def send(label):
+        order.append(label)
+
+    await outbox.send(1, lambda: send("first"))  # Uses up the chat's burst
+    outbox.send(1, lambda: send("notice"), PRIORITY_NOTICE)
+    outbox.send(1, lambda: send("result"), PRIORITY_RESULT)
+    await outbox.drain(5)
+    print(f"  {order}")
+    assert order == ["first", "result", "notice"]
+
+    await outbox.stop()
+
+    # A slow send is not overtaken by the next one to the same chat, even with tokens to spare
+    outbox = Outbox(10, 10, 3, 100, 100, 10, 0)
+    order = []
+
+    async def slow_send(label):
+        await asyncio.sleep(0.05)
+        order.append(label)
+
+    outbox.send(2, lambda: slow_send("slow"), PRIORITY_RESULT)
+    outbox.send(2, lambda: send("fast"))
+    await outbox.drain(5)
+    print(f"  {order}")
+    assert order == ["slow", "fast"]
+
+    # Quiet chats are forgotten once their buckets have refilled
+    outbox._prune(time.monotonic() + 60)
+    assert not outbox.buckets and not outbox.paused_until
+    await outbox.stop()
+
+
+async def check_stop():
+    """Stopping the outbox resolves sends in flight and still queued to None."""
+    outbox = Outbox(1, 1, 1, 100, 100, 10, 0)
+    in_flight = outbox.send(1, lambda: asyncio.sleep(3600))
+    queued = outbox.send(1, lambda: asyncio.sleep(0))  # Waits for the chat's next token
+    await asyncio.sleep(0.1)
+    await outbox.stop()
+    print(f"  {in_flight.result()}, {queued.result()}, {len(outbox.deliveries)} deliveries left")
+    assert in_flight.result() is None and queued.result() is None and not outbox.deliveries
+
+
+class StubBot:
+    """Records the board's Bot API calls; edits fail with edit_error when set."""
+
+    def __init__(self):
+        self.calls = []
+        self.edit_error = None
+
+    async def edit_message_text(self, text, **kwargs):
+        self.calls.append("edit")
+        if self.edit_error is not None:
+            raise self.edit_error
+        return True
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append("send")
+        return SimpleNamespace(message_id=77)
+
+    async def pin_chat_message(self, chat_id, message_id, **kwargs):
+        self.calls.append("pin")
+
+
+async def check_board_failures():
+    """Only a board Telegram reports gone is posted again; other failed edits are retried later."""
+    outbox = Outbox(100, 100, 100, 100, 100, 10, 0)
+    bot = StubBot()
+    posted = []
+    board = LiveBoard(bot, outbox, 1, lambda frame: (frame, None), 5, posted.append, 0)
+
+    bot.edit_error = TelegramNetworkError(None, "Request timeout error")
+    board.frame = "a"
+    await board.refresh()
+    print(f"  network error: {bot.calls}")
+    assert bot.calls == ["edit"] and board.message_id == 5 and board.shown is None and not posted
+
+    bot.edit_error = None
+    await board.refresh()
+    assert bot.calls == ["edit", "edit"] and board.shown == ("a", None)
+
+    bot.calls = []
+    bot.edit_error = TelegramBadRequest(None, "Bad Request: message to edit not found")
+    board.frame = "b"
+    await board.refresh()
+    await outbox.drain(5)
+    await outbox.stop()
+    print(f"  deleted board: {bot.calls}")
+    assert bot.calls == ["edit", "send", "pin"] and board.message_id == 77 and posted == [77]
+
+
+async def attack_burst(client, url, state, update_ids):
+    """Post /sup updates one after another, lifting the global cooldown before each."""
+    for update_id in update_ids:
+        seq = state.seq
+        state.cooldowns.global_deadlines["supply"] = 0
+        resp = await client.post(
+            url, json=make_update(update_id, "/sup", first_name=f"Fighter {update_id}"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+        assert resp.status_code == 200
+        for _ in range(100):
+            if state.seq != seq:
+                break
+            await asyncio.sleep(0.01)
+
+
+async def settle_board(gmud, board):
+    while board.pending is not None and not board.pending.done():
+        await board.pending
+    await gmud.OUTBOX.drain(5)
+
+
+async def main():
+    api_app = web.Application()
+    api_app.router.add_post("/bot{token}/{method}", bot_api)
+    api_runner = web.AppRunner(api_app)
+    await api_runner.setup()
+    api_site = web.TCPSite(api_runner, "127.0.0.1", 0)
+    await api_site.start()
+    api_port = api_site._server.sockets[0].getsockname()[1]
+
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{api_port}"
+    os.environ["WEBHOOK_URL"] = "https://bot.example.com"
+    import gmud
+    # Faster group pacing than Telegram's, to keep the run short
+    gmud.OUTBOX.group_rate = 4
+
+    gmud.http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"stats": STATS}))
+    )
+    bot = gmud.create_bot(TOKEN)
+    dp = gmud.create_dispatcher()
+    webhook = await gmud.start_webhook(bot, dp)
+    url = f"http://{gmud.WEBHOOK_HOST}:{gmud.WEBHOOK_PORT}{gmud.WEBHOOK_PATH}"
+
+    client = httpx.AsyncClient()
+    try:
+        print("Testing webhook registration:")
+        set_webhook = [params for method, params in api_calls if method == "setWebhook"]
+        print(f"  {set_webhook}")
+        assert set_webhook and set_webhook[0]["url"] == "https://bot.example.com" + gmud.WEBHOOK_PATH
+        assert set_webhook[0]["secret_token"] == SECRET
+
+        print("Testing secret token verification:")
+        await asyncio.sleep(1.1)
+        for headers in ({}, {"X-Telegram-Bot-Api-Secret-Token": "wrong"}):
+            resp = await client.post(url, json=make_update(1, "/burn 7"), headers=headers)
+            print(f"  {headers or 'no header'} -> {resp.status_code}")
+            assert resp.status_code == 401
+        await asyncio.sleep(0.2)
+        assert not replied, "rejected updates must not be handled"
+
+        print(f"Sending {NUM_UPDATES} /burn 7 updates from private chats:")
+        sent = {}
+        for update_id in range(1, NUM_UPDATES + 1):
+            sent[update_id] = time.perf_counter()
+            resp = await client.post(
+                url, json=make_update(update_id, "/burn 7", chat_id=1_000 + update_id),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            )
+            assert resp.status_code == 200
+        await wait_for_replies(NUM_UPDATES)
+
+        latencies = sorted((replied[i] - sent[i]) * 1000 for i in sent)
+        print(f"  update-to-reply p50 {latencies[len(latencies) // 2]:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms, max {latencies[-1]:.1f} ms")
+
+        print("Testing per-chat pacing in a group:")
+        group_ids = range(NUM_UPDATES + 1, NUM_UPDATES + 6)
+        for update_id in group_ids:
+            resp = await client.post(
+                url, json=make_update(update_id, "/burn 7"),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            )
+            assert resp.status_code == 200
+        await wait_for_replies(NUM_UPDATES + len(group_ids))
+        times = sorted(replied[i] for i in group_ids)
+        gaps = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+        print(f"  gaps {', '.join(f'{gap:.0f}' for gap in gaps)} ms")
+        # A full bucket covers the burst; every further reply waits for a token
+        min_span = (len(group_ids) - gmud.OUTBOX_CHAT_BURST) / gmud.OUTBOX.group_rate
+        assert times[-1] - times[0] >= 0.9 * min_span, f"replies spread over less than {min_span}s"
+
+        print("Testing RetryAfter handling:")
+        update_id = NUM_UPDATES + 100
+        sent = time.perf_counter()
+        resp = await client.post(
+            url, json=make_update(update_id, "/burn 7", chat_id=FLOOD_CHAT_ID),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+        assert resp.status_code == 200
+        await wait_for_replies(NUM_UPDATES + len(group_ids) + 1)
+        attempts = [p for m, p in api_calls if m == "sendMessage" and int(p["chat_id"]) == FLOOD_CHAT_ID]
+        print(f"  {len(attempts)} attempts, answered after {replied[update_id] - sent:.2f}s")
+        assert len(attempts) == 2 and replied[update_id] - sent >= FLOOD_RETRY_AFTER
+
+        print("Testing priorities:")
+        await check_priority()
+
+        print("Testing outbox shutdown:")
+        await check_stop()
+
+        print("Testing live board edit failures:")
+        await check_board_failures()
+
+        print("Testing the live board:")
+        gmud.LIVE_BOARD = True
+        gmud.LIVE_BOARD_DEBOUNCE_SES = 0.5
+        shard = await gmud.SHARDS.get(gmud.ALLOWED_CHAT_USERNAME)
+        before = len(api_calls)
+        await attack_burst(client, url, shard.state, range(300, 304))
+        board = shard.boards["supply"]
+        await settle_board(gmud, board)
+        calls = api_calls[before:]
+        acks = [p["text"] for m, p in calls if m == "sendMessage" and "reply_parameters" in p]
+        posts = [p for m, p in calls if m == "sendMessage" and "reply_parameters" not in p]
+        pins = [p for m, p in calls if m == "pinChatMessage"]
+        print(f"  acks {acks[1:]}, {len(posts)} board post(s), {len(pins)} pin(s)")
+        assert len(acks) == 4 and all("\n" not in ack for ack in acks[1:])
+        assert len(posts) == 1 and len(pins) == 1
+        assert shard.state.data["boards"]["supply"] == board.message_id == int(pins[0]["message_id"])
+
+        before = len(api_calls)
+        await attack_burst(client, url, shard.state, range(310, 313))
+        await settle_board(gmud, board)
+        edits = [p for m, p in api_calls[before:] if m == "editMessageText"]
+        print(f"  3 more attacks -> {len(edits)} edit(s)")
+        assert len(edits) == 1 and int(edits[0]["message_id"]) == board.message_id
+
+        before = len(api_calls)
+        board.schedule(board.frame)
+        await settle_board(gmud, board)
+        assert len(api_calls) == before, "unchanged board must not be edited"
+        print("  unchanged board -> no edit")
+    finally:
+        await client.aclose()
+        await webhook.cleanup()
+        await gmud.OUTBOX.stop()
+        await gmud.close_http_client()
+        gmud.close_supply_series()
+        await api_runner.cleanup()
+
+    print("OK")
+
+
+asyncio.run(main())
@@ -1,20 +1,39 @@
 #!/usr/bin/env python3
 import os
+import random
 import re
 import time
 from datetime import timezone, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
-import json
 import time
 from datetime import datetime
 import asyncio
+import importlib.util
+from functools import lru_cache
+from contextlib import asynccontextmanager
 import httpx
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram import html
-from scrap import get_gns_amount
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from scrap import close_browsers, BROWSER_EXECUTOR, WALLET as SCRAPER_WALLET
+from balance_providers import JsonRpcBalanceProvider, SeleniumBalanceProvider, FallbackBalanceProvider
+from supply_history import SupplyHistory
+from supply_series import SupplySeries
+import burn_analytics
+import numpy as np
+from storage import JsonStore, SqliteStore
+from leaderboard import Leaderboard
+from singleflight import SingleFlight
+from circuit_breaker import CircuitBreaker
+from outbox import Outbox, PRIORITY_RESULT, PRIORITY_INFO, PRIORITY_NOTICE
+from live_board import LiveBoard
+import metrics
 
 BOT_START_TIME = time.time()
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
@@ -27,21 +46,80 @@ if not TOKEN:
 
 BACKEND_URL = "https://backend-polygon.gains.trade/stats"
 DATA_FILE = "gmud_data.json"
+JOURNAL_FILE = "gmud_journal.jsonl"
+SUPPLY_SERIES_FILE = "gmud_supply.bin"  # Every backend supply entry, synced incrementally
+SUPPLY_DAILY_FILE = "gmud_supply_daily.bin"  # Daily-close rollup of SUPPLY_SERIES_FILE
+JOURNAL_FSYNC = False  # fsync every journal append (safer on power loss, slower)
+SQLITE_FILE = "gmud_data.sqlite3"
+STORAGE_BACKEND = os.getenv("GMUD_STORAGE", "json")  # "json" (snapshot + journal) or "sqlite"
 COOLDOWN_MINUTES = 30
 GLOBAL_COOLDOWN_HOURS = 1.5
 MAX_SUPPLY = 38_892_000
 MAX_RECENT_DAMAGES = 3
+RENDER_CACHE_SIZE = 256  # Boss renders kept per boss, keyed by the visible state
 SUPPLY_FETCH_ATTEMPTS = 5
 SUPPLY_FETCH_SES = 4
+SUPPLY_RETRY_BASE_SES = 0.25  # Backoff before retry n is random in [0, base * 2**n], capped below
+SUPPLY_RETRY_MAX_SES = 2
+SUPPLY_BREAKER_FAILURES = 5  # Consecutive failed requests before the backend is considered down
+SUPPLY_BREAKER_RESET_SES = 30  # Fail fast for this long, then let one trial request through
+SUPPLY_HEDGE_ENABLED = os.getenv("SUPPLY_HEDGE", "0") == "1"  # Race a second request against a slow first one
+SUPPLY_HEDGE_MIN_SAMPLES = 20  # Requests observed before the p95 is trusted
+SUPPLY_HEDGE_DEFAULT_SES = 1.0  # Hedge delay until then
+SUPPLY_HEDGE_MIN_SES = 0.2  # Never hedge sooner than this
 # DEAD_WALLET_BALANCE = 311603
 DEAD_WALLET_BALANCE = 0
-DATA_LOCK = asyncio.Lock()
+SNAPSHOT_SES = 5 * 60  # How often the journal is compacted into a fresh DATA_FILE snapshot
 MAX_BURN_DISPLAY_LINES = 100  # Maximum lines to display before truncating (shows first 10, ..., last 10)
 TRUNCATION_INDICATOR = "  (...)"
-ALLOWED_CHAT_USERNAME = "GainsPriceChat"
+ALLOWED_CHAT_USERNAME = "GainsPriceChat"  # The original game chat; keeps the un-prefixed data files
+# Chats the bosses can be fought in: usernames or numeric chat ids, each with its own game state
+ALLOWED_CHATS = [c.strip() for c in os.getenv("ALLOWED_CHATS", ALLOWED_CHAT_USERNAME).split(",") if c.strip()]
+SHARD_DIR = "gmud_chats"  # Data files of every chat other than ALLOWED_CHAT_USERNAME
+SHARD_IDLE_SES = 30 * 60  # Unload a chat's state after this long without commands
+TELEGRAM_MESSAGE_LIMIT = 4096
+OUTBOX_CHAT_RATE = 1  # Messages per second to one private chat
+OUTBOX_GROUP_RATE = 20 / 60  # Telegram allows about 20 messages a minute in a group
+OUTBOX_CHAT_BURST = 3  # Messages a quiet chat may get at once
+OUTBOX_GLOBAL_RATE = 30  # Messages per second over all chats
+OUTBOX_MAX_QUEUE = 1000  # Least urgent replies are dropped beyond this
+OUTBOX_MAX_RETRIES = 3  # RetryAfter flood waits honoured per message before giving up
+OUTBOX_DRAIN_SES = 10  # Time given to queued replies on shutdown
+LIVE_BOARD = os.getenv("LIVE_BOARD", "0") == "1"  # One pinned board per boss, edited in place; attacks get one-line acks
+LIVE_BOARD_DEBOUNCE_SES = 3  # Board changes within this window become one edit
+GMUD_PAGE_SIZE = 50  # Players per /gmud page
 WHALE_START_AMOUNT = 300000  # Starting GNS balance for the whale boss
+WHALE_SCRAPE_DEADLINE_SES = 60  # Give up on a whale scrape (including time queued for a browser)
+WHALE_RPC_URL = os.getenv("WHALE_RPC_URL")  # JSON-RPC endpoint for balanceOf reads; scraper only if unset
+GNS_TOKEN_ADDRESS = os.getenv("GNS_TOKEN_ADDRESS", "0x18c11FD286C5EC11c3b683Caa813B77f5163A122")  # GNS on Arbitrum
+WHALE_WALLETS = os.getenv("WHALE_WALLETS", SCRAPER_WALLET).split(",")  # The whale's HP is their combined balance
+WHALE_POLL_SES = 5 * 60  # Background whale balance refresh interval
+WHALE_POLL_RETRY_SES = 30  # First retry after a failed refresh, doubled up to WHALE_POLL_SES
+WHALE_MAX_AGE_SES = 15 * 60  # /wha scrapes on demand if the polled balance is older than this
+SUPPLY_CACHE_FRESH_SES = 5 * 60  # Serve cached /stats history without refetching
+SUPPLY_CACHE_STALE_SES = 60 * 60  # Serve cached history but refresh it in the background
+SUPPLY_POLL_SES = float(os.getenv("SUPPLY_POLL_SES", 60))  # Background /stats refresh interval
+SUPPLY_POLL_JITTER = 0.1  # +-10% on every poll delay
+SUPPLY_POLL_RETRY_SES = 5  # First retry after a failed poll, doubled up to SUPPLY_POLL_MAX_BACKOFF_SES
+SUPPLY_POLL_MAX_BACKOFF_SES = 5 * 60
+HTTP_CONNECT_SES = 2
+HTTP_MAX_CONNECTIONS = 10
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 5
+HTTP_KEEPALIVE_EXPIRY_SES = 120
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None  # httpx needs the h2 package for HTTP/2
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Prometheus endpoint, local only by default
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9101))  # 0 disables the endpoint
+ADMIN_USER_IDS = {int(uid) for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}  # May use /perf
+GMUD_MODE = os.getenv("GMUD_MODE", "polling")  # "polling" or "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public base URL Telegram posts updates to, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Checked against X-Telegram-Bot-Api-Secret-Token on every update
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")  # Listen address, normally behind a TLS reverse proxy
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # Alternative Bot API server (local server or a test fake)
+
+http_client = None  # Shared httpx.AsyncClient, created in main() and closed on shutdown
 
-extra_message_last_shown_date = None  # Track last date the extra message was shown
 
 def boss_name(supply):
     if supply < 26_000_000:
@@ -78,75 +156,191 @@ def generate_progress_bar(current, maximum, length=25):
     empty = length - filled
     return "█" * filled + "-" * empty
 
-def get_latest_entry_for_date(entries, target_date):
-    """Find the latest entry for a specific date by timestamp.
-    
-    API may return entries in inconsistent order, so we need to find
-    the entry with the latest timestamp for the given date.
-    
-    Args:
-        entries: List of entry dicts with 'date' and 'token_supply' fields
-        target_date: A date object to match entries against
-    
-    Returns:
-        The entry dict with the latest timestamp for the target date, or None if not found
-    """
-    latest_entry = None
-    latest_dt = None
-
-    for e in entries:
-        date_str = e.get("date")
-        if not date_str:
-            continue
-
-        entry_dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-
-        if entry_dt.date() != target_date:
-            continue
-
-        if latest_dt is None or entry_dt > latest_dt:
-            latest_dt = entry_dt
-            latest_entry = e
-
-    return latest_entry
 
+# --- Boss art, built once at import ---
+SERPENT_HEADER = (
+    "-----------------------------",
+    ".[   THE ANCIENT SERPENT   ].",
+    ".[                         ].",
+)
+
+DRAGONLORD_HEADER = (
+    "-----------------------------",
+    ".[SUPPLARIUS THE DRAGONLORD].",
+    ".[                         ].",
+)
+
+CRITICAL_HIT_ART = (
+    ".                           .",
+    ".###########################.",
+    ".       CRITICAL HIT        .",
+    ".###########################.",
+    ".  BOSS ENTERS NEXT STAGE!  .",
+    ".###########################.",
+    ".                           .",
+    ".        ,-'         ,-,-   .",
+    ".       (-_         / / |   .",
+    ". ,-'      #:     _/ / /    .",
+    ".(-_      #'  _,-' `Z_/     .",
+    ". \"#:      ,-'_,-.    \\  _  .",
+    ".  #'    _(XX'_XX\\     \\\" | .",
+    ".,--_,--'                 | .",
+    ". \"\"                      L-.",
+    ".\------v--v-.         /   \\.",
+    ". --^--------/         |    .",
+    ". \\_________________,-'     .",
+    ".                           .",
+)
+
+SERPENT_ART = (
+    ".                           .",
+    ".   /)     /  /,,''/--.     .",
+    ".  //   / ,(''(    .   \/   .",
+    ". //    ('              ./  .",
+    ".( \  ,'    .-.-._        / .",
+    ". \ \\'     /.--. .)       ./.",
+    ".  \     -{/    \ .)        .",
+    ".  <\      )     ).:)       .",
+    ".   >^,  //     /..:)       .",
+    ".    | ,'/     /. .:)      /.",
+    ".    ( |(_    (...::)     ( .",
+    ".    (O| /     \:.::)       .",
+    ".     \|/      /`.:::)      .",
+    ".             /  /`,.:)     .",
+    ".           ,' ,'.'  `:>-._..",
+    ".                           .",
+)
+
+SERPENT_RISING_ART = (
+    ".                           .",
+    ".      ,===:'.,             .",
+    ". ,-'       `:.`---.__      .",
+    ".(-_          `:.     `--.  .",
+    ". \"#:          \.        `..",
+    ".  #'   (,,(,    \.         .",
+    ".    (,'     `/   \.   ,--._.",
+    ".,  ,'  ,--.  `,   \.;'     .",
+    ". `{D, {    \  :    \;      .",
+    ".   V,,'    /  /    //      .",
+    ".   j;;    /  ,' ,-//.    ,-.",
+    ".   \;'   /  ,' /  _  \  /  .",
+    ".         \   `'  / \  `'  /.",
+    ".          `.___,'   `.__,' .",
+    ".                           .",
+)
+
+DRAGONLORD_RISING_ART = (
+    ".                           .",
+    ".           /           /   .",
+    ".  ,-'     /' .,,,,  ./     .",
+    ". (-_     /';'     ,/       .",
+    ".  \"#:   / /   ,,//,`'`     .",
+    ".   #'  (_,, '_,  ,,,' ``   .",
+    ".   #   |@\__/@  ,,, ;\" `   .",
+    ". (-,  /        ,''/' `,``  .",
+    ".   - /   .     ./, `,, ` ; .",
+    ".  ,./  .   ,-,',` ,,/''\\,' .",
+    ". |   /; ./,,'`,,'' |   |   .",
+    ". |     /   ','    /    |   .",
+    ".  \\___/'   '     |     |   .",
+    ".    `,,'  |      /     `\\  .",
+    ".         /      |        ~\\.",
+    ".        '       (          .",
+    ".       :                   .",
+    ".      ; .         \--      .",
+    ".    :   \         ;        .",
+)
+
+DRAGONLORD_ART = (
+    ".                           .",
+    ".                    ,-,-   .",
+    ".                   / / |   .",
+    ". ,-'             _/ / /    .",
+    ".(-_          _,-' `Z_/     .",
+    ". \"#:      ,-'_,-.    \\  _  .",
+    ".  #'    _(_-'_()\\     \\\" | .",
+    ".,--_,--'                 | .",
+    ". \"\"                      L-.",
+    ".,--^---v--v-._        /   \\.",
+    ". \\_________________,-'     .",
+    ".                  \\        .",
+    ".                   \\       .",
+    ".                    \\      .",
+    ".                           .",
+)
+
+# (supply upper bound, header, art) per boss stage; None is the open-ended last stage
+SUPPLARIUS_STAGES = (
+    (25_000_000, SERPENT_HEADER, SERPENT_ART),
+    (26_000_000, SERPENT_HEADER, SERPENT_RISING_ART),
+    (27_000_000, DRAGONLORD_HEADER, DRAGONLORD_RISING_ART),
+    (None, DRAGONLORD_HEADER, DRAGONLORD_ART),
+)
+
+WHALE_HEADER = (
+    "-----------------------------",
+    ".[        THE WHALE        ].",
+    ".[                         ].",
+)
+
+WHALE_DEFEATED_ART = (
+    ".                           .",
+    ".###########################.",
+    ".   WE HAVE DEFEATED THE    .",
+    ".          WHALE!           .",
+    ".###########################.",
+    ".                           .",
+    ".   ______...----..____..-'`.",
+    ". ,'.                       .",
+    ".:                          .",
+    ".|                       -- .",
+    ".|               X.X      -..",
+    ".:                 __       .",
+    ". `._________     (  `.   -..",
+    ".    `-------------\   \_.--.",
+    ".                   `--'    .",
+    ".                           .",
+)
+
+# TODO: Replace this placeholder with custom whale ASCII art
+WHALE_ART = (
+    ".                           .",
+    ".   ______...----..____..-'`.",
+    ". ,'.                       .",
+    ".:                          .",
+    ".|                       -- .",
+    ".|               -.-      -..",
+    ".:                 __       .",
+    ". `._________     (  `.   -..",
+    ".    `-------------\   \_.--.",
+    ".                   `--'    .",
+    ".                           .",
+)
 
-def get_overall_latest_entry(entries):
-    """Find the entry with the most recent timestamp overall.
-    
-    Args:
-        entries: List of entry dicts with 'date' and 'token_supply' fields
-    
-    Returns:
-        The entry dict with the latest timestamp, or None if no valid entries
-    """
-    latest_entry = None
-    latest_dt = None
-
-    for e in entries:
-        date_str = e.get("date")
-        if not date_str:
-            continue
 
-        entry_dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-
-        if latest_dt is None or entry_dt > latest_dt:
-            latest_dt = entry_dt
-            latest_entry = e
+def format_supplarius(current_supply, recent_damages, last_attacker, last_damage, players, crossed_million=False, from_status=False):
+    """Render the supply boss. Only the visible state is passed on, so
+    repeated renders of an unchanged boss are served from the render cache."""
+    recent = tuple((dmg, attacker) for dmg, attacker in recent_damages[-MAX_RECENT_DAMAGES:])
+    return render_supplarius(current_supply, recent, last_damage, crossed_million)
 
-    return latest_entry
 
+def supplarius_stage(current_supply):
+    """Return the (header, art) of the boss stage for current_supply."""
+    for bound, header, art in SUPPLARIUS_STAGES:
+        if bound is None or current_supply < bound:
+            return header, art
 
-def format_supplarius(current_supply, recent_damages, last_attacker, last_damage, players, crossed_million=False, from_status=False):
-    global extra_message_last_shown_date
 
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_supplarius(current_supply, recent_damages, last_damage, crossed_million):
     progress_bar = generate_progress_bar(current_supply, MAX_SUPPLY)
     current_str = f"{current_supply:,}".replace(",", " ")
     max_str = f"{MAX_SUPPLY:,}".replace(",", " ")
     supply_line = f"[{current_str:>11} /{max_str:>11} ]"
 
     damage_lines = []
-    for dmg, attacker in recent_damages[-MAX_RECENT_DAMAGES:]:
+    for dmg, attacker in recent_damages:
         if dmg == 0:
             nick = truncate_nickname(attacker, 12)
             line = f"      <miss>  {nick:<12} "
@@ -164,64 +358,10 @@ def format_supplarius(current_supply, recent_damages, last_attacker, last_damage
             line = f"-{dmg_str}  {nick:<12} "
             damage_lines.append(line.rjust(27))
 
-    attacker_lines = []
-    TOTAL_WIDTH = 27
-    any_effect = True
-
-    dragon_name = boss_name(current_supply)
-
-    if False:
-        if last_damage > 0 and last_attacker != "":
-            dmg_str = f"{last_damage:,}".replace(",", " ")
-            attacker_nick = truncate_nickname(last_attacker)
-            attacker_lines.append(f" > {attacker_nick} deals  ".ljust(TOTAL_WIDTH))
-            attacker_lines.append(f"   {dmg_str} [Fire Damage]".ljust(TOTAL_WIDTH))
-            attacker_lines.append(f"   to the {dragon_name}.    ".ljust(TOTAL_WIDTH))
-
-        elif last_damage == 0 and last_attacker != "":
-            attacker_nick = truncate_nickname(last_attacker)
-            attacker_lines.append(f" > {attacker_nick} misses!".ljust(TOTAL_WIDTH))
-            attacker_lines.append("   Attack had no effect! ".ljust(TOTAL_WIDTH))
-            any_effect = False
-
-        elif last_attacker == "" and last_damage > 0:
-            heal_str = f"{last_damage:,}".replace(",", " ")
-            attacker_lines.append(f" > The {dragon_name} heals!  ".ljust(TOTAL_WIDTH))
-            attacker_lines.append(f"   +{heal_str} Hit Points. ".ljust(TOTAL_WIDTH))
-
-    sorted_players = sorted(players.items(), key=lambda x: x[1]['damage'], reverse=True)
-    leaderboard_lines = []
-    for username, data in sorted_players[:3]:
-        nick = truncate_nickname(username, 15)
-        dmg_str = f"{data['damage']:,}".replace(",", " ")
-        leaderboard_lines.append(f" {nick:<15} {dmg_str:>9} ")
-
-    guild_total = sum(p['damage'] for p in players.values())
-    guild_str = f"{guild_total:,}".replace(",", " ")
-
-
-    if current_supply < 25_000_000:
-        lines = [
-            "-----------------------------",
-            ".[   THE ANCIENT SERPENT   ].",
-            ".[                         ].",
-        ]
-    elif current_supply < 26_000_000:
-        lines = [
-            "-----------------------------",
-            ".[   THE ANCIENT SERPENT   ].",
-            ".[                         ].",
-        ]
-    else:
-        lines = [
-            "-----------------------------",
-            ".[SUPPLARIUS THE DRAGONLORD].",
-            ".[                         ].",
-        ]
+    header, art = supplarius_stage(current_supply)
 
-    lines = lines + [
+    lines = list(header) + [
         f".{supply_line}.",
-        # ".[ Until next million:     ].",
         f".[{progress_bar}].",
         ".                           .",
     ]
@@ -229,138 +369,11 @@ def format_supplarius(current_supply, recent_damages, last_attacker, last_damage
     for line in reversed(damage_lines):
         lines.append(f".{line}.")
 
-    if any_effect:
-        if crossed_million:
-            lines.extend([
-                ".                           .",
-                ".###########################.",
-                ".       CRITICAL HIT        .",
-                ".###########################.",
-                ".  BOSS ENTERS NEXT STAGE!  .",
-                ".###########################.",
-                ".                           .",
-                ".        ,-'         ,-,-   .",
-                ".       (-_         / / |   .",
-                ". ,-'      #:     _/ / /    .",
-                ".(-_      #'  _,-' `Z_/     .",
-                ". \"#:      ,-'_,-.    \\  _  .",
-                ".  #'    _(XX'_XX\\     \\\" | .",
-                ".,--_,--'                 | .",
-                ". \"\"                      L-.",
-                ".\------v--v-.         /   \\.",
-                ". --^--------/         |    .",
-                ". \\_________________,-'     .",
-                ".                           .",
-            ])
-        else:
-            if current_supply < 25_000_000:
-                add_lines = [
-                    ".                           .",       
-                    ".   /)     /  /,,''/--.     .",       
-                    ".  //   / ,(''(    .   \/   .",       
-                    ". //    ('              ./  .",       
-                    ".( \  ,'    .-.-._        / .",       
-                    ". \ \\'     /.--. .)       ./.",       
-                    ".  \     -{/    \ .)        .",       
-                    ".  <\      )     ).:)       .",       
-                    ".   >^,  //     /..:)       .",       
-                    ".    | ,'/     /. .:)      /.",       
-                    ".    ( |(_    (...::)     ( .",       
-                    ".    (O| /     \:.::)       .",       
-                    ".     \|/      /`.:::)      .",       
-                    ".             /  /`,.:)     .",       
-                    ".           ,' ,'.'  `:>-._..",
-                    ".                           ."
-                ]
-            elif current_supply < 26_000_000:
-                add_lines = [
-                    ".                           .",
-                    ".      ,===:'.,             .",                    
-                    ". ,-'       `:.`---.__      .",                  
-                    ".(-_          `:.     `--.  .",                  
-                    ". \"#:          \.        `..",                  
-                    ".  #'   (,,(,    \.         .",
-                    ".    (,'     `/   \.   ,--._.",                  
-                    ".,  ,'  ,--.  `,   \.;'     .",                  
-                    ". `{D, {    \  :    \;      .",                  
-                    ".   V,,'    /  /    //      .",                  
-                    ".   j;;    /  ,' ,-//.    ,-.",                  
-                    ".   \;'   /  ,' /  _  \  /  .",                  
-                    ".         \   `'  / \  `'  /.",                  
-                    ".          `.___,'   `.__,' .",
-                    ".                           ."
-                ]
-            elif current_supply < 27_000_000:
-                # Show extra message once per day
-                today = datetime.now(timezone.utc).date()
-                show_extra_message = (extra_message_last_shown_date is None or 
-                                     extra_message_last_shown_date != today)
-                
-                if False and show_extra_message and not from_status:
-                    lines.extend([
-                        ".                           .",
-                        ".---------------------------.",
-                        ".     ABANDON ALL HOPE,     .",
-                        ".         YE, WHO           .",
-                        ".       DARE FIGHT ME       .",
-                        ".---------------------------.",
-                    ])
-                    extra_message_last_shown_date = today
-
-                add_lines = [
-                    ".                           .",
-                    ".           /           /   .",                                                    
-                    ".  ,-'     /' .,,,,  ./     .",                                           
-                    ". (-_     /';'     ,/       .",                                           
-                    ".  \"#:   / /   ,,//,`'`     .",                                           
-                    ".   #'  (_,, '_,  ,,,' ``   .",                                           
-                    ".   #   |@\__/@  ,,, ;\" `   .",                                           
-                    ". (-,  /        ,''/' `,``  .",                                           
-                    ".   - /   .     ./, `,, ` ; .",                                           
-                    ".  ,./  .   ,-,',` ,,/''\\,' .",                                           
-                    ". |   /; ./,,'`,,'' |   |   .",                                           
-                    ". |     /   ','    /    |   .",                                           
-                    ".  \\___/'   '     |     |   .",                                           
-                    ".    `,,'  |      /     `\\  .",                                           
-                    ".         /      |        ~\\.",                                           
-                    ".        '       (          .",                                           
-                    ".       :                   .",                                           
-                    ".      ; .         \--      .",                                           
-                    ".    :   \         ;        ."
-                ]
-            else:
-                add_lines = [
-                    ".                           .",
-                    ".                    ,-,-   .",
-                    ".                   / / |   .",
-                    ". ,-'             _/ / /    .",
-                    ".(-_          _,-' `Z_/     .",
-                    ". \"#:      ,-'_,-.    \\  _  .",
-                    ".  #'    _(_-'_()\\     \\\" | .",
-                    ".,--_,--'                 | .",
-                    ". \"\"                      L-.",
-                    ".,--^---v--v-._        /   \\.",
-                    ". \\_________________,-'     .",
-                    ".                  \\        .",
-                    ".                   \\       .",
-                    ".                    \\      .",
-                    ".                           .",
-                ]
-
-            if last_damage > 0:
-                n_lines = 1 + (last_damage // 500)
-                add_lines = add_lines[:n_lines]
-
-                lines = lines + add_lines
-
-    if False:
-        if not from_status:
-            lines.extend([
-                "-----------------------------",
-            ])
-
-            for line in attacker_lines:
-                lines.append(f".{line}.")
+    if crossed_million:
+        lines.extend(CRITICAL_HIT_ART)
+    elif last_damage > 0:
+        n_lines = 1 + (last_damage // 500)
+        lines.extend(art[:n_lines])
 
     lines.append("-----------------------------")
 
@@ -378,8 +391,20 @@ def format_whale(current_gns, recent_damages, last_attacker, last_damage, player
         show_full: If True, show full whale (for first attack)
         defeated: If True, show victory message
     """
+    recent = tuple((dmg, attacker) for dmg, attacker in recent_damages[-MAX_RECENT_DAMAGES:])
+    # Show proportional whale based on damage, or all of it on the first attack
+    if show_full:
+        art_lines = len(WHALE_ART)
+    elif last_damage > 0:
+        art_lines = min(len(WHALE_ART), 1 + int(last_damage / 1000))
+    else:
+        art_lines = 0
     # Round to int for display
-    current_gns = int(current_gns)
+    return render_whale(int(current_gns), recent, art_lines, defeated)
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_whale(current_gns, recent_damages, art_lines, defeated):
     current_str = f"{current_gns:,}".replace(",", " ")
     start_str = f"{WHALE_START_AMOUNT:,}".replace(",", " ")
     gns_line = f"[{current_str:>11} /{start_str:>11} ]"
@@ -392,7 +417,7 @@ def format_whale(current_gns, recent_damages, last_attacker, last_damage, player
     progress_bar = "█" * filled + "-" * empty
     
     damage_lines = []
-    for dmg, attacker in recent_damages[-MAX_RECENT_DAMAGES:]:
+    for dmg, attacker in recent_damages:
         if dmg == 0:
             nick = truncate_nickname(attacker, 12)
             line = f"      <miss>  {nick:<12} "
@@ -408,10 +433,7 @@ def format_whale(current_gns, recent_damages, last_attacker, last_damage, player
             line = f"-{dmg_str}  {nick:<12} "
             damage_lines.append(line.rjust(27))
     
-    lines = [
-        "-----------------------------",
-        ".[        THE WHALE        ].",
-        ".[                         ].",
+    lines = list(WHALE_HEADER) + [
         f".{gns_line}.",
         f".[{progress_bar}].",
         ".                           .",
@@ -421,74 +443,16 @@ def format_whale(current_gns, recent_damages, last_attacker, last_damage, player
         lines.append(f".{line}.")
     
     if defeated:
-        # Victory message
-        lines.extend([
-            ".                           .",
-            ".###########################.",
-            ".   WE HAVE DEFEATED THE    .",
-            ".          WHALE!           .",
-            ".###########################.",
-            ".                           .",
-            ".   ______...----..____..-'`.",
-            ". ,'.                       .",
-            ".:                          .",
-            ".|                       -- .",
-            ".|               X.X      -..",
-            ".:                 __       .",
-            ". `._________     (  `.   -..",
-            ".    `-------------\   \_.--.",
-            ".                   `--'    .",
-            ".                           .",
-        ])
+        lines.extend(WHALE_DEFEATED_ART)
     else:
-        # Show whale ASCII art
-        if show_full or last_damage > 0:
-            # TODO: Replace this placeholder with custom whale ASCII art
-            # The number of lines shown should be proportional to damage
-            # For now, using a simple placeholder
-            whale_art = [
-                ".                           .",
-                ".   ______...----..____..-'`.",
-                ". ,'.                       .",
-                ".:                          .",
-                ".|                       -- .",
-                ".|               -.-      -..",
-                ".:                 __       .",
-                ". `._________     (  `.   -..",
-                ".    `-------------\   \_.--.",
-                ".                   `--'    .",
-                ".                           .",
-            ]
-            
-            if show_full:
-                # Show entire whale on first attack
-                lines.extend(whale_art)
-            else:
-                # Show proportional whale based on damage
-                n_lines = min(len(whale_art), 1 + int(last_damage / 1000))
-                lines.extend(whale_art[:n_lines])
+        lines.extend(WHALE_ART[:art_lines])
     
     lines.append("-----------------------------")
     
     return "\n".join(lines)
 
 
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-            data.setdefault('recent_damages', [])
-            data.setdefault('last_attacker', "")
-            data.setdefault('last_damage', 0)
-            data.setdefault('last_global_attack', None)
-            # Whale-specific fields
-            data.setdefault('whale_last_supply', None)
-            data.setdefault('whale_recent_damages', [])
-            data.setdefault('whale_last_attacker', "")
-            data.setdefault('whale_last_damage', 0)
-            data.setdefault('whale_last_global_attack', None)
-            data.setdefault('whale_first_attack', True)
-            return data
+def new_data():
     return {
         "last_supply": None,
         "players": {},
@@ -502,18 +466,378 @@ def load_data():
         "whale_last_attacker": "",
         "whale_last_damage": 0,
         "whale_last_global_attack": None,
-        "whale_first_attack": True
+        "whale_first_attack": True,
+        # Live board message id per boss
+        "boards": {}
     }
 
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+def load_data(store):
+    data = store.load_snapshot()
+    if data is None:
+        return new_data()
+    data.setdefault('recent_damages', [])
+    data.setdefault('last_attacker', "")
+    data.setdefault('last_damage', 0)
+    data.setdefault('last_global_attack', None)
+    # Whale-specific fields
+    data.setdefault('whale_last_supply', None)
+    data.setdefault('whale_recent_damages', [])
+    data.setdefault('whale_last_attacker', "")
+    data.setdefault('whale_last_damage', 0)
+    data.setdefault('whale_last_global_attack', None)
+    data.setdefault('whale_first_attack', True)
+    data.setdefault('boards', {})
+    return data
+
+def ensure_player(data, username):
+    if username not in data['players']:
+        data['players'][username] = {'damage': 0, 'last_attack': None}
+    return data['players'][username]
+
+def apply_event(data, event):
+    """Apply one journal event to the game data.
+
+    This is the only place game data changes, so replaying the journal
+    on startup rebuilds exactly the state the live handlers produced.
+
+    Event types:
+        init: boss seen for the first time, sets its starting HP
+        attack / miss: /sup dealt positive / zero damage to the supply boss
+        heal: supply went up, the boss heals (no attacker)
+        stage_crossed: supply crossed a million mark, recent damages reset
+        whale_hit: /wha attack on the whale
+        status: /drag status check, refreshes the user's cooldown
+        board_posted: a new live board message was posted for the boss
+    """
+    kind = event['type']
+    ts = event['ts']
 
-def get_cooldown_remaining(last_attack_time):
-    if not last_attack_time:
-        return 0
-    elapsed = time.time() - last_attack_time
-    return max(0, COOLDOWN_MINUTES * 60 - elapsed)
+    if kind == "init":
+        ensure_player(data, event['user'])
+        if event['boss'] == "whale":
+            data['whale_last_supply'] = event['supply']
+            data['whale_first_attack'] = True
+        else:
+            data['last_supply'] = event['supply']
+
+    elif kind in ("attack", "miss"):
+        player = ensure_player(data, event['user'])
+        damage = event['damage']
+        data['recent_damages'].append((damage, event['user']))
+        data['last_attacker'] = event['user']
+        data['last_damage'] = damage
+        player['last_attack'] = ts
+        data['last_global_attack'] = ts
+        if damage > 0:
+            player['damage'] += damage
+        data['last_supply'] = event['supply']
+
+    elif kind == "heal":
+        # NOTE: personal cooldown NOT applied
+        ensure_player(data, event['user'])
+        healed = event['damage']
+        data['recent_damages'].append((healed, ""))   # empty attacker
+        data['last_attacker'] = ""
+        data['last_damage'] = healed
+        data['last_global_attack'] = ts
+        data['last_supply'] = event['supply']
+
+    elif kind == "stage_crossed":
+        data['recent_damages'] = []
+
+    elif kind == "whale_hit":
+        player = ensure_player(data, event['user'])
+        damage = event['damage']
+        data['whale_recent_damages'].append((damage, event['user']))
+        data['whale_last_attacker'] = event['user']
+        data['whale_last_damage'] = damage
+        data['whale_last_global_attack'] = ts
+        if damage > 0:
+            player['damage'] += damage
+        data['whale_first_attack'] = False
+        data['whale_last_supply'] = event['supply']
+
+    elif kind == "status":
+        player = ensure_player(data, event['user'])
+        player['last_attack'] = ts
+        if data['last_supply'] is None:
+            data['last_supply'] = event['supply']
+
+    elif kind == "board_posted":
+        data['boards'][event['boss']] = event['message_id']
+
+    else:
+        print(f"Unknown journal event type: {kind}")
+
+class CooldownIndex:
+    """Cooldown deadlines (epoch seconds) kept next to the game data.
+
+    Updated on every recorded event, so handlers can reject attacks still on
+    cooldown without waiting for the chat's lock.
+    """
+
+    def __init__(self, data):
+        self.global_deadlines = {
+            "supply": self._global_deadline(data['last_global_attack']),
+            "whale": self._global_deadline(data['whale_last_global_attack']),
+        }
+        self.user_deadlines = {
+            name: self._user_deadline(player['last_attack'])
+            for name, player in data['players'].items()
+            if player['last_attack']
+        }
+
+    @staticmethod
+    def _global_deadline(last_global_attack):
+        if last_global_attack is None:
+            return 0
+        return last_global_attack + GLOBAL_COOLDOWN_HOURS * 3600
+
+    @staticmethod
+    def _user_deadline(last_attack):
+        return last_attack + COOLDOWN_MINUTES * 60
+
+    def update(self, data, event):
+        self.global_deadlines["supply"] = self._global_deadline(data['last_global_attack'])
+        self.global_deadlines["whale"] = self._global_deadline(data['whale_last_global_attack'])
+        user = event.get('user')
+        if user is not None and data['players'][user]['last_attack']:
+            self.user_deadlines[user] = self._user_deadline(data['players'][user]['last_attack'])
+
+    def global_remaining(self, boss):
+        return max(0, self.global_deadlines[boss] - time.time())
+
+    def user_remaining(self, username):
+        return max(0, self.user_deadlines.get(username, 0) - time.time())
+
+def read_state(store):
+    """Load a store's snapshot and replay its journal.
+
+    Returns (data, seq, replayed event count). Only reads the store, so it
+    can run in a worker thread.
+    """
+    data = load_data(store)
+    seq = data.pop('journal_seq', 0)
+    offset = data.pop('journal_offset', 0)
+
+    replayed = 0
+    for event in store.read_events(seq, offset):
+        apply_event(data, event)
+        seq = event['seq']
+        replayed += 1
+    return data, seq, replayed
+
+class GameState:
+    """Game data kept in memory, backed by a snapshot + event journal store.
+
+    Handlers change state only through record(), which appends the event to
+    the journal and applies it. The background flusher (and shutdown)
+    compacts the journal into a fresh snapshot when anything changed.
+
+    Pass loaded (a read_state(store) result) when the store was already
+    read elsewhere, e.g. in a worker thread.
+    """
+
+    def __init__(self, store, loaded=None):
+        self.store = store
+        if loaded is None:
+            with metrics.stage("state_load"):
+                loaded = read_state(store)
+        self.data, self.seq, replayed = loaded
+        if replayed:
+            print(f"Replayed {replayed} journal events")
+
+        self.leaderboard = Leaderboard(self.data['players'])
+        self.cooldowns = CooldownIndex(self.data)
+
+        self.dirty = replayed > 0
+        self.snapshots = 0
+        store.open()
+
+    def record(self, event_type, **fields):
+        self.seq += 1
+        event = {"seq": self.seq, "type": event_type, "ts": time.time(), **fields}
+        with metrics.stage("state_save"):
+            self.store.append(event)
+        apply_event(self.data, event)
+        if 'user' in event:
+            self.leaderboard.update(event['user'], self.data['players'][event['user']]['damage'])
+        self.cooldowns.update(self.data, event)
+        self.dirty = True
+        return event
+
+    async def flush(self):
+        if not self.dirty:
+            return
+        # Serialize on the event loop so the snapshot matches the journal offset, write in a thread
+        payload = self.store.prepare_snapshot(self.data, self.seq)
+        self.dirty = False
+        try:
+            loop = asyncio.get_running_loop()
+            with metrics.stage("state_save"):
+                await loop.run_in_executor(None, self.store.write_snapshot, payload)
+            self.snapshots += 1
+        except Exception as e:
+            self.dirty = True
+            print(f"Error saving game state snapshot: {e}")
+
+    def close(self):
+        self.store.close()
+
+def shard_paths(chat_key):
+    """(json snapshot, journal, sqlite) file paths of a chat's game state."""
+    if chat_key == ALLOWED_CHAT_USERNAME:
+        return DATA_FILE, JOURNAL_FILE, SQLITE_FILE
+    base = os.path.join(SHARD_DIR, chat_key)
+    return base + ".json", base + ".jsonl", base + ".sqlite3"
+
+def create_store(chat_key=ALLOWED_CHAT_USERNAME):
+    """Open the storage backend selected by GMUD_STORAGE for one chat."""
+    data_file, journal_file, sqlite_file = shard_paths(chat_key)
+    os.makedirs(os.path.dirname(data_file) or ".", exist_ok=True)
+
+    if STORAGE_BACKEND == "sqlite":
+        store = SqliteStore(sqlite_file)
+        if store.is_empty() and os.path.exists(data_file):
+            # First start on SQLite: import the JSON snapshot and its journal
+            json_store = JsonStore(data_file, journal_file)
+            data, seq, _ = read_state(json_store)
+            events = list(json_store.read_events(0))
+            store.import_state(data, seq, events)
+            print(f"Imported {len(data['players'])} players and {len(events)} events into {sqlite_file}")
+        return store
+
+    if STORAGE_BACKEND != "json":
+        print(f"Unknown GMUD_STORAGE '{STORAGE_BACKEND}', using json")
+    return JsonStore(data_file, journal_file, fsync=JOURNAL_FSYNC)
+
+def parse_allowed_chats(entries):
+    """Map lowercased chat usernames / chat ids to the chat key used for their data files."""
+    chats = {}
+    for entry in entries:
+        entry = entry.lstrip("@")
+        if not re.fullmatch(r"-?\d+|[A-Za-z]\w{3,31}", entry):
+            print(f"Ignoring invalid entry in ALLOWED_CHATS: {entry!r}")
+            continue
+        if entry.lower() == ALLOWED_CHAT_USERNAME.lower():
+            entry = ALLOWED_CHAT_USERNAME
+        chats[entry.lower()] = entry
+    return chats
+
+class ChatShard:
+    """One chat's game state and the lock its commands serialize on."""
+
+    def __init__(self, key, state):
+        self.key = key
+        self.state = state
+        self.lock = asyncio.Lock()
+        self.last_used = time.time()
+        self.boards = {}  # boss -> LiveBoard, in LIVE_BOARD mode
+
+    def board_updates(self):
+        """Board refreshes still waiting or in progress."""
+        return [board.pending for board in self.boards.values() if board.pending and not board.pending.done()]
+
+class ChatShards:
+    """Game state of every allowed chat, loaded on first use and unloaded when idle.
+
+    Each chat has its own store, state and lock, so commands in one chat
+    never wait on another chat's lock or disk writes. Loading runs in a
+    worker thread; concurrent commands for a chat that is still loading
+    share that one load.
+    """
+
+    def __init__(self, allowed, idle_ses):
+        self.allowed = allowed
+        self.idle_ses = idle_ses
+        self.shards = {}
+        self.loading = {}
+
+    def chat_key(self, chat):
+        """The key of an allowed chat, or None if the bosses can't be fought there."""
+        if chat.username and chat.username.lower() in self.allowed:
+            return self.allowed[chat.username.lower()]
+        return self.allowed.get(str(chat.id))
+
+    def usernames(self):
+        return [key for key in self.allowed.values() if not key.lstrip("-").isdigit()]
+
+    def load(self, key):
+        """Return the shard for key, loading it on the calling thread if needed."""
+        shard = self.shards.get(key)
+        if shard is None:
+            shard = self.shards[key] = ChatShard(key, GameState(create_store(key)))
+        shard.last_used = time.time()
+        return shard
+
+    async def get(self, key):
+        shard = self.shards.get(key)
+        if shard is not None:
+            shard.last_used = time.time()
+            return shard
+
+        task = self.loading.get(key)
+        if task is None:
+            task = self.loading[key] = asyncio.ensure_future(self._load(key))
+            task.add_done_callback(lambda _: self.loading.pop(key, None))
+        shard = await asyncio.shield(task)
+        shard.last_used = time.time()
+        return shard
+
+    async def _load(self, key):
+        def read():
+            store = create_store(key)
+            return store, read_state(store)
+
+        # Only the file reads run in the thread; metrics and GameState stay on the loop
+        start = time.perf_counter()
+        store, loaded = await asyncio.get_running_loop().run_in_executor(None, read)
+        metrics.record_stage("state_load", time.perf_counter() - start)
+        shard = ChatShard(key, GameState(store, loaded))
+        current = self.shards.setdefault(key, shard)
+        if current is not shard:
+            # load() got there first while we were reading
+            shard.state.close()
+        return current
+
+    async def flush_all(self):
+        for shard in list(self.shards.values()):
+            await shard.state.flush()
+
+    async def evict_idle(self):
+        """Snapshot and unload chats with no command for idle_ses."""
+        now = time.time()
+        for key, shard in list(self.shards.items()):
+            if now - shard.last_used < self.idle_ses or shard.lock.locked() or shard.board_updates():
+                continue
+            await shard.state.flush()
+            if shard.state.dirty or now < shard.last_used:
+                continue  # Snapshot failed, or the chat became active meanwhile
+            del self.shards[key]
+            shard.state.close()
+            print(f"Unloaded idle chat {key}")
+
+    def close_all(self):
+        for shard in self.shards.values():
+            shard.state.close()
+        self.shards = {}
+
+SHARDS = ChatShards(parse_allowed_chats(ALLOWED_CHATS), SHARD_IDLE_SES)
+
+def get_game_state():
+    """Return the game state of the original chat (ALLOWED_CHAT_USERNAME), loading it if needed."""
+    return SHARDS.load(ALLOWED_CHAT_USERNAME).state
+
+def only_in_allowed_chats_text():
+    chats = " or ".join(f"@{name}" for name in SHARDS.usernames()) or "the game chats"
+    return f"⚠️ This command can only be used in {chats}"
+
+async def state_flusher():
+    metrics.current_handler.set("state_flusher")
+    while True:
+        await asyncio.sleep(SNAPSHOT_SES)
+        await SHARDS.flush_all()
+        await SHARDS.evict_idle()
 
 def format_time(seconds):
     if seconds <= 0:
@@ -532,218 +856,634 @@ def format_time(seconds):
         
     return " ".join(parts)
 
-async def get_gns_total_supply():
+def create_http_client():
+    """Create the pooled HTTP client used for all backend requests.
+
+    Connections are kept alive between commands so repeated /sup, /drag,
+    /burn and /burnt calls skip the TCP+TLS handshake to the backend.
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SES,
+        ),
+        timeout=httpx.Timeout(SUPPLY_FETCH_SES, connect=HTTP_CONNECT_SES),
+    )
+
+def get_http_client():
+    """Return the shared HTTP client, creating it lazily if main() has not."""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = create_http_client()
+    return http_client
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+SUPPLY_BREAKER = CircuitBreaker("supply", SUPPLY_BREAKER_FAILURES, SUPPLY_BREAKER_RESET_SES)
+
+async def timed_get(client, url):
+    start = time.perf_counter()
+    # The client default applies: SUPPLY_FETCH_SES overall, HTTP_CONNECT_SES to connect
+    resp = await client.get(url)
+    resp.raise_for_status()
+    metrics.observe("upstream_seconds", time.perf_counter() - start, target="supply")
+    return resp
+
+def supply_hedge_delay():
+    """Seconds to wait for the first request before sending a hedge, or None to never hedge."""
+    if not SUPPLY_HEDGE_ENABLED:
+        return None
+    latency = metrics.get_histogram("upstream_seconds", target="supply")
+    if latency is None or latency.count < SUPPLY_HEDGE_MIN_SAMPLES:
+        return SUPPLY_HEDGE_DEFAULT_SES
+    return max(SUPPLY_HEDGE_MIN_SES, latency.quantile(0.95))
+
+async def hedged_get(client, url):
+    """GET url; if it is slower than the p95 so far, race a second request against it.
+
+    The first successful response wins and the other request is cancelled.
+    """
+    first = asyncio.ensure_future(timed_get(client, url))
+    delay = supply_hedge_delay()
+    if delay is None:
+        return await first
+
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            metrics.inc("supply_fetch_hedged_total")
+            pending.add(asyncio.ensure_future(timed_get(client, url)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        metrics.inc("supply_fetch_hedge_wins_total")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def fetch_supply_history():
+    """Download the backend /stats history.
+
+    Retries back off exponentially with jitter, and once SUPPLY_BREAKER has
+    seen the backend fail repeatedly, calls fail fast without a request.
+
+    Returns:
+        A SupplyHistory of the stats entries, or None if the backend returned nothing usable
+    """
     url = BACKEND_URL
+    client = get_http_client()
 
     for attempt in range(SUPPLY_FETCH_ATTEMPTS):
+        if not SUPPLY_BREAKER.allow():
+            print(f"Supply backend circuit open, not fetching (retry in {format_time(int(SUPPLY_BREAKER.retry_in()))})")
+            metrics.inc("supply_fetch_failures_total", reason="circuit_open")
+            return None
+
         try:
-            async with httpx.AsyncClient(timeout=SUPPLY_FETCH_SES) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
-                if data and 'stats' in data and len(data['stats']) > 0:
-                    entries = data['stats']
-                    today = datetime.now(timezone.utc).date()
-                    
-                    # Prefer today's latest, fallback to overall latest, then first entry
-                    today_entry = get_latest_entry_for_date(entries, today)
-                    if today_entry:
-                        return today_entry['token_supply'] - DEAD_WALLET_BALANCE
-                    
-                    overall_entry = get_overall_latest_entry(entries)
-                    if overall_entry:
-                        return overall_entry['token_supply'] - DEAD_WALLET_BALANCE
-                    
-                    return entries[0]['token_supply'] - DEAD_WALLET_BALANCE
-                return None
+            resp = await hedged_get(client, url)
+            SUPPLY_BREAKER.record_success()
+            data = resp.json()
+            if data and 'stats' in data and len(data['stats']) > 0:
+                return SupplyHistory(data['stats'])
+            metrics.inc("supply_fetch_failures_total", reason="empty")
+            return None
 
         except Exception as e:
             print(f"[Attempt {attempt+1}/{SUPPLY_FETCH_ATTEMPTS}] Error fetching supply: {e}")
+            SUPPLY_BREAKER.record_failure()
+            metrics.inc("supply_fetch_errors_total", error=type(e).__name__)
             if attempt < SUPPLY_FETCH_ATTEMPTS - 1:
-                await asyncio.sleep(0.5)
+                metrics.inc("supply_fetch_retries_total")
+                await asyncio.sleep(random.uniform(0, min(SUPPLY_RETRY_MAX_SES, SUPPLY_RETRY_BASE_SES * 2 ** attempt)))
 
+    metrics.inc("supply_fetch_failures_total", reason="attempts_exhausted")
     return None
 
+supply_series = None
+
+def get_supply_series():
+    """Return the local supply time series, opening its files on first use."""
+    global supply_series
+    if supply_series is None:
+        supply_series = SupplySeries(SUPPLY_SERIES_FILE, SUPPLY_DAILY_FILE)
+    return supply_series
+
+def close_supply_series():
+    global supply_series
+    if supply_series is not None:
+        supply_series.close()
+        supply_series = None
+
+class SupplyHistoryCache:
+    """In-memory copy of the parsed backend /stats history.
+
+    Within fresh_ses of the last successful fetch the cached entries are
+    served as-is. Up to stale_ses they are still served, but a refresh is
+    started in the background. Older (or missing) data is fetched inline.
+
+    Once supply_poller() owns the cache (polled=True), readers never go
+    upstream: they get the latest published snapshot, or None if it is
+    older than stale_ses.
+
+    Concurrent refreshes (readers missing at once, or a reader racing the
+    poller) share a single backend request. Lookups and failed refreshes
+    are counted in metrics, so they show up in /metrics and /perf.
+    """
+
+    def __init__(self, fresh_ses, stale_ses):
+        self.fresh_ses = fresh_ses
+        self.stale_ses = stale_ses
+        self.history = None
+        self.fetched_at = None
+        self.polled = False
+        self.published = asyncio.Event()
+        self._refresh_task = None
+        self.flight = SingleFlight("supply")
+
+    def age(self):
+        if self.fetched_at is None:
+            return None
+        return time.time() - self.fetched_at
+
+    async def refresh(self):
+        return await self.flight.do(self._refresh)
+
+    async def _refresh(self):
+        history = await fetch_supply_history()
+        if history is None:
+            metrics.inc("supply_refresh_failures_total")
+            return None
+        # Readers only ever see a complete, already parsed snapshot
+        self.history = history
+        self.fetched_at = time.time()
+        self.published.set()
+        try:
+            get_supply_series().sync(history.records)
+        except Exception as e:
+            print(f"Error syncing local supply series: {e}")
+        return history
+
+    def _refresh_in_background(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def get(self):
+        if self.polled and self.history is None:
+            # Cold start: wait for the poller's first snapshot instead of fetching ourselves
+            try:
+                await asyncio.wait_for(self.published.wait(), SUPPLY_FETCH_SES)
+            except asyncio.TimeoutError:
+                pass
+
+        age = self.age()
+        if age is not None and age < self.fresh_ses:
+            metrics.inc("supply_cache_lookups_total", result="hit")
+            return self.history
+        if age is not None and age < self.stale_ses:
+            metrics.inc("supply_cache_lookups_total", result="stale")
+            if not self.polled:
+                self._refresh_in_background()
+            return self.history
+
+        metrics.inc("supply_cache_lookups_total", result="miss")
+        if self.polled:
+            return None
+        return await self.refresh()
+
+SUPPLY_CACHE = SupplyHistoryCache(SUPPLY_CACHE_FRESH_SES, SUPPLY_CACHE_STALE_SES)
+
+async def supply_poller():
+    """Refresh SUPPLY_CACHE on a fixed, jittered schedule, backing off while the backend fails.
+
+    Upstream load stays at one request per interval however busy the chats are.
+    """
+    SUPPLY_CACHE.polled = True
+    metrics.current_handler.set("supply_poller")
+    failures = 0
+    while True:
+        with metrics.stage("fetch"):
+            history = await SUPPLY_CACHE.refresh()
+        if history is not None:
+            failures = 0
+            delay = SUPPLY_POLL_SES
+        else:
+            failures += 1
+            delay = min(SUPPLY_POLL_MAX_BACKOFF_SES, SUPPLY_POLL_RETRY_SES * 2 ** (failures - 1))
+            print(f"Supply refresh failed ({failures} in a row), retrying in {format_time(delay)}")
+        await asyncio.sleep(delay * random.uniform(1 - SUPPLY_POLL_JITTER, 1 + SUPPLY_POLL_JITTER))
+
+async def get_gns_total_supply():
+    history = await SUPPLY_CACHE.get()
+    if not history:
+        return None
+
+    today = datetime.now(timezone.utc).date()
+    return history.current_entry(today)['token_supply'] - DEAD_WALLET_BALANCE
+
+def create_whale_provider():
+    """JSON-RPC balanceOf when WHALE_RPC_URL is set, with the DeBank scraper as fallback."""
+    scraper = SeleniumBalanceProvider(WHALE_SCRAPE_DEADLINE_SES)
+    if not WHALE_RPC_URL:
+        return scraper
+    rpc = JsonRpcBalanceProvider(WHALE_RPC_URL, GNS_TOKEN_ADDRESS, get_http_client)
+    return FallbackBalanceProvider([rpc, scraper])
+
+WHALE_PROVIDER = create_whale_provider()
+
 async def get_whale_gns():
-    """Fetch whale's GNS balance from web scraper."""
+    """Fetch the combined GNS balance of the tracked whale wallets."""
     try:
-        # Run the blocking Selenium scraper in a thread pool
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, get_gns_amount)
-        
-        if result is None:
+        balances = await WHALE_PROVIDER.get_balances(WHALE_WALLETS)
+        if any(balance is None for balance in balances.values()):
             return None
-        
-        # Parse the string result to float
-        return float(result)
+        return float(sum(balances.values()))
     except Exception as e:
         print(f"Error fetching whale GNS: {e}")
         return None
 
-async def handle_sup_command(message: Message):
-    async with DATA_LOCK:
-        print("Sup command detected")
+class WhaleBalance:
+    """Latest whale GNS balance and when it was read.
 
-        # Skip messages sent before bot started
-        message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
+    Concurrent refreshes share one balance read (and so one browser scrape).
+    """
 
-        if message_ts < BOT_START_TIME:
-            print("Ignoring stale message")
-            return  # ignore old messages
+    def __init__(self):
+        self.value = None
+        self.fetched_at = None
+        self.flight = SingleFlight("whale")
 
-        if message.chat.username != ALLOWED_CHAT_USERNAME:
-            await message.reply("⚠️ This command can only be used in @GainsPriceChat")
-            return
+    def age(self):
+        if self.fetched_at is None:
+            return None
+        return time.time() - self.fetched_at
+
+    async def refresh(self):
+        return await self.flight.do(self._refresh)
+
+    async def _refresh(self):
+        value = await get_whale_gns()
+        if value is None:
+            return False
+        self.value = value
+        self.fetched_at = time.time()
+        return True
+
+    async def get(self, max_age):
+        """Return (balance, age in seconds), scraping now if the balance is older than max_age."""
+        age = self.age()
+        if age is None or age > max_age:
+            await self.refresh()
+        if self.value is None:
+            return None, None
+        return self.value, self.age()
+
+WHALE_BALANCE = WhaleBalance()
+
+async def whale_poller():
+    metrics.current_handler.set("whale_poller")
+    failures = 0
+    while True:
+        with metrics.stage("scrape"):
+            refreshed = await WHALE_BALANCE.refresh()
+        if refreshed:
+            failures = 0
+            delay = WHALE_POLL_SES
+        else:
+            failures += 1
+            delay = min(WHALE_POLL_SES, WHALE_POLL_RETRY_SES * 2 ** (failures - 1))
+            print(f"Whale balance refresh failed ({failures} in a row), retrying in {format_time(delay)}")
+        await asyncio.sleep(delay)
+
+@asynccontextmanager
+async def data_lock(shard, handler):
+    """Hold the chat's lock, recording how long the handler waited for and held it."""
+    start = time.perf_counter()
+    async with shard.lock:
+        acquired = time.perf_counter()
+        metrics.observe("stage_seconds", acquired - start, handler=handler, stage="lock_wait")
+        try:
+            yield
+        finally:
+            metrics.observe("lock_hold_seconds", time.perf_counter() - acquired, handler=handler)
 
-        user = message.from_user
-        username = (
-            user.full_name
-            or user.first_name
-            or user.username
-            or f"User{user.id}"
-        )
+def create_outbox():
+    return Outbox(
+        OUTBOX_CHAT_RATE, OUTBOX_GROUP_RATE, OUTBOX_CHAT_BURST,
+        OUTBOX_GLOBAL_RATE, OUTBOX_GLOBAL_RATE, OUTBOX_MAX_QUEUE, OUTBOX_MAX_RETRIES,
+    )
 
-        data = load_data()
+OUTBOX = create_outbox()
 
-        # Check global cooldown FIRST - blocks all actions
-        if data['last_global_attack'] is not None:
-            elapsed = time.time() - data['last_global_attack']
-            global_cd = max(0, GLOBAL_COOLDOWN_HOURS * 3600 - elapsed)
-            if global_cd > 0:
-                await message.reply(f"⏳ You can attack again in: *{format_time(global_cd)}*", parse_mode="Markdown")
-                return
+def reply(message, text, priority=PRIORITY_INFO, **kwargs):
+    """Queue a reply to message without waiting for it to be sent.
 
-        if username not in data['players']:
-            data['players'][username] = {'damage': 0, 'last_attack': None}
+    Returns a future of the sent Message (None if it could not be sent).
+    """
+    return OUTBOX.send(message.chat.id, lambda: message.reply(text, **kwargs), priority)
+
+def supplarius_frame(data, crossed_million=False):
+    """format_supplarius arguments showing the supply boss as data has it now."""
+    return (
+        data['last_supply'],
+        list(data['recent_damages']),
+        data['last_attacker'],
+        data['last_damage'],
+        data['players'],
+        crossed_million,
+    )
+
+def whale_frame(data, show_full=False, defeated=False):
+    """format_whale arguments showing the whale as data has it now."""
+    return (
+        data['whale_last_supply'],
+        list(data['whale_recent_damages']),
+        data['whale_last_attacker'],
+        data['whale_last_damage'],
+        data['players'],
+        show_full,
+        defeated,
+    )
+
+def render_board(boss, frame):
+    """(text, parse mode) of the live board for boss showing frame."""
+    if boss == "whale":
+        board = format_whale(*frame)
+    else:
+        board = format_supplarius(*frame)
+    return code_block(board), "MarkdownV2"
+
+def live_board(shard, chat_id, boss, bot):
+    """The chat's LiveBoard for boss, created on first use."""
+    board = shard.boards.get(boss)
+    if board is None:
+        state = shard.state
+        board = shard.boards[boss] = LiveBoard(
+            bot,
+            OUTBOX,
+            chat_id,
+            lambda frame: render_board(boss, frame),
+            state.data['boards'].get(boss),
+            lambda message_id: state.record("board_posted", boss=boss, message_id=message_id),
+            LIVE_BOARD_DEBOUNCE_SES,
+        )
+    return board
 
-        player = data['players'][username]
+def format_attack_ack(boss, data, username):
+    """One-line reply to an attack in live-board mode; the board shows the rest."""
+    if boss == "whale":
+        damage = data['whale_last_damage']
+        if damage < 0:
+            return f"💚 The whale gained {-damage:,.2f} GNS"
+        if damage > 0:
+            return f"⚔️ {username} hit the whale for {damage:,.2f}"
+        return f"💨 {username} missed the whale"
 
-        current_supply = await get_gns_total_supply()
-        if current_supply is None:
-            await message.reply("❌ Failed to fetch GNS supply. Try again later.")
-            return
+    name = boss_name(data['last_supply'])
+    damage = data['last_damage']
+    if data['last_attacker'] != username:
+        # The supply went up: nobody hit, the boss healed
+        return f"💚 {name} healed {damage:,} HP"
+    if damage > 0:
+        return f"⚔️ {username} hit {name} for {damage:,}"
+    return f"💨 {username} missed {name}"
 
-        if data['last_supply'] is None:
-            data['last_supply'] = current_supply
-            save_data(data)
-            await message.reply(
-                f"🎮 *BOSS BATTLE INITIALIZED!*\n\n🐉 HP: *{current_supply:,}*\nAttack again to deal damage!",
-                parse_mode="Markdown"
-            )
-            return
+def apply_sup_attack(state, username, current_supply):
+    """Apply a /sup attack for a freshly fetched supply. Call with the chat's lock held.
 
-        damage = data['last_supply'] - current_supply
-        
-        # Check if we crossed a million mark downwards
-        # e.g. 30,050,000 -> 29,950,000
-        old_millions = data['last_supply'] // 1_000_000
-        new_millions = current_supply // 1_000_000
-        crossed_million = (new_millions < old_millions)
+    Returns:
+        (reply text, parse mode, frame) tuple, frame being the
+        format_supplarius arguments of the boss after the attack. In
+        LIVE_BOARD mode the reply is a one-line ack and the frame is left
+        to the live board to render.
+    """
+    data = state.data
+
+    if data['last_supply'] is None:
+        state.record("init", boss="supply", user=username, supply=current_supply)
+        return (
+            f"🎮 *BOSS BATTLE INITIALIZED!*\n\n🐉 HP: *{current_supply:,}*\nAttack again to deal damage!",
+            "Markdown",
+            supplarius_frame(data)
+        )
+
+    damage = data['last_supply'] - current_supply
+    
+    # Check if we crossed a million mark downwards
+    # e.g. 30,050,000 -> 29,950,000
+    old_millions = data['last_supply'] // 1_000_000
+    new_millions = current_supply // 1_000_000
+    crossed_million = (new_millions < old_millions)
 
+    if damage < 0:
         # -------------------------
         # Healing logic
         # NO PERSONAL COOLDOWN, but triggers global cooldown
         # -------------------------
-        if damage < 0:
-            healed = -damage
-            data['recent_damages'].append((healed, ""))   # empty attacker
-            data['last_attacker'] = ""
-            data['last_damage'] = healed
-            data['last_global_attack'] = time.time()
-
-            # NOTE: personal cooldown NOT applied
-            data['last_supply'] = current_supply
-            save_data(data)
-
-            supplarius = format_supplarius(
-                current_supply,
-                data['recent_damages'],
-                data['last_attacker'],
-                data['last_damage'],
-                data['players']
-            )
-            await message.reply(code_block(supplarius), parse_mode="MarkdownV2")
-            return
-
+        state.record("heal", boss="supply", user=username, damage=-damage, supply=current_supply)
+        frame = supplarius_frame(data)
+    else:
         # -------------------------
         # Normal attack logic
         # -------------------------
-        data['recent_damages'].append((damage, username))
-        data['last_attacker'] = username
-        data['last_damage'] = damage
-        player['last_attack'] = time.time()
-        data['last_global_attack'] = time.time()
+        state.record("attack" if damage > 0 else "miss", boss="supply", user=username, damage=damage, supply=current_supply)
+        # Taken before stage_crossed clears the recent damages it shows
+        frame = supplarius_frame(data, crossed_million)
+        if crossed_million:
+            state.record("stage_crossed", boss="supply")
 
-        if damage > 0:
-            player['damage'] += damage
+    if LIVE_BOARD:
+        return format_attack_ack("supply", data, username), None, frame
 
-        data['last_supply'] = current_supply
-        save_data(data)
+    with metrics.stage("render"):
+        supplarius = format_supplarius(*frame)
+    return code_block(supplarius), "MarkdownV2", frame
 
-        supplarius = format_supplarius(
-            current_supply,
-            data['recent_damages'],
-            data['last_attacker'],
-            data['last_damage'],
-            data['players'],
-            crossed_million=crossed_million
-        )
+@metrics.instrument("sup")
+async def handle_sup_command(message: Message):
+    print("Sup command detected")
 
-        if crossed_million:
-            data['recent_damages'] = []
-            save_data(data)
+    # Skip messages sent before bot started
+    message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
+
+    if message_ts < BOT_START_TIME:
+        print("Ignoring stale message")
+        return  # ignore old messages
 
-        await message.reply(code_block(supplarius), parse_mode="MarkdownV2")
+    chat_key = SHARDS.chat_key(message.chat)
+    if chat_key is None:
+        reply(message, only_in_allowed_chats_text(), priority=PRIORITY_NOTICE)
+        return
 
-async def handle_gmud_command(message: Message):
-    async with DATA_LOCK:
-        message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
-        if message_ts < BOT_START_TIME:
-            print("Ignoring stale message")
-            return
+    user = message.from_user
+    username = (
+        user.full_name
+        or user.first_name
+        or user.username
+        or f"User{user.id}"
+    )
+
+    shard = await SHARDS.get(chat_key)
+    state = shard.state
+
+    # Check global cooldown FIRST - blocks all actions.
+    # Answered from the cooldown index, without waiting for the lock.
+    seen_seq = state.seq
+    global_cd = state.cooldowns.global_remaining("supply")
+    if global_cd > 0:
+        reply(message, f"⏳ You can attack again in: *{format_time(global_cd)}*", parse_mode="Markdown", priority=PRIORITY_NOTICE)
+        return
 
-        data = load_data()
-        players = data.get("players", {})
+    # Fetch outside the lock so other commands don't queue behind the backend
+    with metrics.stage("fetch"):
+        current_supply = await get_gns_total_supply()
+    if current_supply is None:
+        reply(message, "❌ Failed to fetch GNS supply. Try again later.", priority=PRIORITY_NOTICE)
+        return
 
-        if not players:
-            await message.reply("No attacks have been recorded yet", parse_mode="MarkdownV2")
-            return
+    async with data_lock(shard, "sup"):
+        if state.seq != seen_seq:
+            # Someone else changed the state while we were fetching: validate again
+            metrics.inc("optimistic_conflicts", handler="sup")
+            global_cd = state.cooldowns.global_remaining("supply")
+        if global_cd <= 0:
+            text, parse_mode, frame = apply_sup_attack(state, username, current_supply)
+
+    if global_cd > 0:
+        reply(message, f"⏳ You can attack again in: *{format_time(global_cd)}*", parse_mode="Markdown", priority=PRIORITY_NOTICE)
+        return
 
-        # Sort all players by damage descending
-        sorted_players = sorted(players.items(), key=lambda x: x[1]['damage'], reverse=True)
+    reply(message, text, parse_mode=parse_mode, priority=PRIORITY_RESULT)
+    if LIVE_BOARD:
+        live_board(shard, message.chat.id, "supply", message.bot).schedule(frame)
 
-        lines = [
-            "---------------------------",
-            ".    GMUD LEADERBOARDS    .",
-            "---------------------------",
-        ]
+def format_leaderboard_line(rank, username, damage, rank_width):
+    # Adjust nickname length based on rank width to fit in total width
+    # Layout: .{rank:>rank_width} {nick:<max_nick_len} {dmg:>10}.
+    # Available for nick = TOTAL_WIDTH(27) - borders(2) - rank_width - spaces(2) - dmg_col(10)
+    TOTAL_WIDTH = 27
+    max_nick_len = TOTAL_WIDTH - 2 - rank_width - 2 - 10
+    max_nick_len = max(5, max_nick_len)  # Minimum 5 chars for nick
 
-        # Format each player: rank, nickname and total damage (rounded to int)
-        TOTAL_WIDTH = 27
-        num_players = len(sorted_players)
-        # Calculate width needed for rank number (e.g., "1." vs "10." vs "100.")
-        rank_width = len(str(num_players)) + 1  # +1 for the dot
-        
-        for rank, (username, pdata) in enumerate(sorted_players, start=1):
-            # Adjust nickname length based on rank width to fit in total width
-            # Layout: .{rank:>rank_width} {nick:<max_nick_len} {dmg:>10}.
-            # Available for nick = TOTAL_WIDTH(27) - borders(2) - rank_width - spaces(2) - dmg_col(10)
-            max_nick_len = TOTAL_WIDTH - 2 - rank_width - 2 - 10
-            max_nick_len = max(5, max_nick_len)  # Minimum 5 chars for nick
-            
-            nick = truncate_nickname(username, max_nick_len)
-            dmg = int(pdata['damage'])  # Round to int
-            dmg_str = f"{dmg:,}".replace(",", " ")
-            
-            rank_str = f"{rank}."
-            line_content = f"{rank_str:>{rank_width}} {nick:<{max_nick_len}} {dmg_str:>10}"
-            lines.append(f".{line_content}.")
+    nick = truncate_nickname(username, max_nick_len)
+    dmg = int(damage)  # Round to int
+    dmg_str = f"{dmg:,}".replace(",", " ")
+
+    rank_str = f"{rank}."
+    line_content = f"{rank_str:>{rank_width}} {nick:<{max_nick_len}} {dmg_str:>10}"
+    return f".{line_content}."
 
-        lines.append("---------------------------")
+def code_block_length(line):
+    # Length of a line once code_block() has escaped it, plus its newline
+    return len(line) + line.count('\\') + line.count('`') + 1
 
-        # Send as code block
-        leaderboard_text = code_block("\n".join(lines))
-        await message.reply(leaderboard_text, parse_mode="MarkdownV2")
+def format_leaderboard_page(leaderboard, page, username=None):
+    """Render one page of the leaderboard, never exceeding one Telegram message.
+
+    Only the players on the requested page are read from the ranking.
+    """
+    num_players = len(leaderboard)
+    pages = max(1, -(-num_players // GMUD_PAGE_SIZE))
+    # Calculate width needed for rank number (e.g., "1." vs "10." vs "100.")
+    rank_width = len(str(num_players)) + 1  # +1 for the dot
+
+    header = [
+        "---------------------------",
+        ".    GMUD LEADERBOARDS    .",
+        "---------------------------",
+    ]
+    footer = ["---------------------------"]
+    if pages > 1:
+        footer.append(f".{f'Page {page}/{pages}':^25}.")
+    rank = leaderboard.rank(username) if username else None
+    if rank is not None:
+        footer.append(f".{f'Your rank: {rank}/{num_players}':^25}.")
+    if len(footer) > 1:
+        footer.append("---------------------------")
+
+    budget = TELEGRAM_MESSAGE_LIMIT - len(code_block("")) - sum(code_block_length(line) for line in header + footer)
+    lines = list(header)
+
+    start = (page - 1) * GMUD_PAGE_SIZE
+    for rank, (name, damage) in enumerate(leaderboard.slice(start, start + GMUD_PAGE_SIZE), start=start + 1):
+        line = format_leaderboard_line(rank, name, damage, rank_width)
+        budget -= code_block_length(line)
+        if budget < 0:
+            break
+        lines.append(line)
+
+    return "\n".join(lines + footer)
+
+@metrics.instrument("gmud")
+async def handle_gmud_command(message: Message):
+    message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
+    if message_ts < BOT_START_TIME:
+        print("Ignoring stale message")
+        return
+
+    username = None
+    user = message.from_user
+    if user:
+        username = (
+            user.full_name
+            or user.first_name
+            or user.username
+            or f"User{user.id}"
+        )
+
+    # Outside the game chats (e.g. in DMs) show the original chat's board
+    shard = await SHARDS.get(SHARDS.chat_key(message.chat) or ALLOWED_CHAT_USERNAME)
+
+    async with data_lock(shard, "gmud"):
+        leaderboard = shard.state.leaderboard
+        num_players = len(leaderboard)
+        rank = leaderboard.rank(username) if username else None
+
+        # /gmud [page|me]
+        pages = max(1, -(-num_players // GMUD_PAGE_SIZE))
+        text = message.text.strip().split()
+        page = 1
+        error = None
+        if len(text) > 1:
+            arg = text[1].lower()
+            if arg == "me":
+                if rank is None:
+                    error = "❌ You are not on the leaderboard yet."
+                else:
+                    page = (rank - 1) // GMUD_PAGE_SIZE + 1
+            elif arg.isdigit():
+                page = int(arg)
+                if not 1 <= page <= pages:
+                    error = f"❌ Page {page} does not exist (1-{pages})."
+            else:
+                error = "❌ Usage: /gmud [page|me]"
+
+        if num_players and not error:
+            with metrics.stage("render"):
+                leaderboard_text = code_block(format_leaderboard_page(leaderboard, page, username))
+
+    if not num_players:
+        reply(message, "No attacks have been recorded yet", parse_mode="MarkdownV2")
+        return
+
+    if error:
+        reply(message, error)
+        return
+
+    # Send as code block
+    reply(message, leaderboard_text, parse_mode="MarkdownV2")
 
 async def _handle_burn_impl(message: Message, cumulative: bool):
     """Shared implementation for /burn and /burnt commands.
@@ -819,7 +1559,7 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
                         _, start_days = parse_value_to_days(parts[0])
                         _, end_days = parse_value_to_days(parts[1])
                         if start_days > end_days:
-                            await message.reply(f"❌ Invalid range: {arg} (start must be <= end)")
+                            reply(message, f"❌ Invalid range: {arg} (start must be <= end)")
                             return
                         # Range is exclusive of end (e.g., 1w-2w = days 7-13, not 7-14)
                         for day in range(start_days, end_days):
@@ -831,7 +1571,7 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
                 label, days = parse_value_to_days(arg)
                 periods_to_show.append((label, days))
             except ValueError:
-                await message.reply(f"❌ Invalid number format: {arg}")
+                reply(message, f"❌ Invalid number format: {arg}")
                 return
     else:
         # default periods
@@ -844,35 +1584,32 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
     if cumulative:
         for label, days in periods_to_show:
             if days == 0:
-                await message.reply("❌ Cannot show cumulative burn for 0 days. Use /burn 0 for today's burn.")
+                reply(message, "❌ Cannot show cumulative burn for 0 days. Use /burn 0 for today's burn.")
                 return
 
     # --- fetch supply history ---
-    async with httpx.AsyncClient(timeout=5) as client:
-        try:
-            r = await client.get(BACKEND_URL)
-            r.raise_for_status()
-            entries = r.json().get("stats", [])
-        except:
-            await message.reply("❌ Failed to fetch supply history.")
-            return
+    # The local series goes back further than the backend's window and keeps
+    # working while the backend is down; the fetched history is the fallback.
+    with metrics.stage("fetch"):
+        history = await SUPPLY_CACHE.get()
+    render_start = time.perf_counter()
+    series = get_supply_series()
+    if history is not None and history.latest is not None and not series.covers(history.latest.dt):
+        # The series missed a sync, so the fetched history is more current
+        source = history
+    else:
+        source = series if len(series) else history
+    if source is None:
+        reply(message, "❌ Failed to fetch supply history.")
+        return
 
-    if not entries:
-        await message.reply("❌ No supply history available.")
+    if not source:
+        reply(message, "❌ No supply history available.")
         return
 
-    # Get today's supply using the latest entry for today
+    # Get today's supply using the latest entry for today, falling back to the most recent entry
     today = datetime.now(timezone.utc).date()
-    today_entry = get_latest_entry_for_date(entries, today)
-    if today_entry:
-        today_supply = today_entry["token_supply"] - DEAD_WALLET_BALANCE
-    else:
-        # Fallback: find the most recent entry by timestamp if no entry for today
-        overall_entry = get_overall_latest_entry(entries)
-        if overall_entry:
-            today_supply = overall_entry["token_supply"] - DEAD_WALLET_BALANCE
-        else:
-            today_supply = entries[0]["token_supply"] - DEAD_WALLET_BALANCE
+    today_supply = source.current_supply(today) - DEAD_WALLET_BALANCE
 
     # --- formatting helpers ---
     LABEL_WIDTH = 5  # right-align period labels
@@ -913,81 +1650,67 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
     if cumulative:
         supply_lines = [SEP,f"  Supply:" + (" " * 9) + f"{today_supply:>{NUM_WIDTH},}", SEP]
     
-    total_burned = 0
-    total_pct = 0
-    count = 0
-    max_burned = 0
-    max_burned_pct = 0
-    max_burned_date = None
-    
-    # Collect all data entries first (for truncation)
-    data_burn_lines = []
-    data_supply_lines = []  # Only used for cumulative
+    # Every requested day is looked up at once in a dense days-ago array of
+    # daily closes, and only the rows that survive truncation are formatted
+    days = np.array([d for _, d in periods_to_show], dtype=np.int64)
+    closes = burn_analytics.dense_closes(*source.daily_closes(), today.toordinal()) - DEAD_WALLET_BALANCE
 
-    for label, days in periods_to_show:
+    def number(value, integral):
+        return int(value) if integral else float(value)
+
+    def period_label(i):
+        label = periods_to_show[i][0]
         if not cumulative:
             if label == "0d":
                 label = "Today"
             if label == "1d":
                 label = "Ystdy"
+        return label
 
-        target_date = (datetime.now(timezone.utc) - timedelta(days=days)).date()
-
-        if cumulative:
-            # Cumulative burn: from that day until now
-            entry = get_latest_entry_for_date(entries, target_date)
-            if not entry:
-                data_burn_lines.append(f"{label}: No data")
-                data_supply_lines.append(f"{label}: No data")
-                continue
-
-            old_supply = entry["token_supply"] - DEAD_WALLET_BALANCE
-            burned = old_supply - today_supply
-            pct = burned / old_supply * 100 if old_supply > 0 else 0
-
-            data_burn_lines.append(format_burn_line(label, burned, pct))
-            data_supply_lines.append(format_supply_line(label, old_supply))
-        else:
-            # Daily burn: on that specific day
-            target_date_before = (datetime.now(timezone.utc) - timedelta(days=days + 1)).date()
-            entry_day = get_latest_entry_for_date(entries, target_date)
-            entry_day_before = get_latest_entry_for_date(entries, target_date_before)
-            
-            if not entry_day or not entry_day_before:
-                data_burn_lines.append(f"{label}: No data")
-                continue
+    data_burn_lines = []
+    data_supply_lines = []  # Only used for cumulative
+    head, tail = burn_analytics.visible_rows(len(periods_to_show), MAX_BURN_DISPLAY_LINES)
 
-            supply_day = entry_day["token_supply"] - DEAD_WALLET_BALANCE
-            supply_day_before = entry_day_before["token_supply"] - DEAD_WALLET_BALANCE
-            
-            # Burn ON that day = supply at day before - supply at that day
-            burned_on_day = supply_day_before - supply_day
-            pct = burned_on_day / supply_day_before * 100 if supply_day_before > 0 else 0
-
-            data_burn_lines.append(format_burn_line(label, burned_on_day, pct))
-
-            # Track max burn (always, even if truncated in display)
-            if burned_on_day > max_burned:
-                max_burned = burned_on_day
-                max_burned_pct = pct
-                max_burned_date = target_date
-
-            total_burned += burned_on_day
-            total_pct += pct
-            count += 1
-
-    # Apply truncation: show first N, (...), last N if total exceeds MAX_BURN_DISPLAY_LINES
-    def apply_truncation(lines):
-        """Truncate list to show first and last portions with (...) in between."""
-        if len(lines) <= MAX_BURN_DISPLAY_LINES:
-            return lines
-        first_count = MAX_BURN_DISPLAY_LINES // 2  # 10
-        last_count = MAX_BURN_DISPLAY_LINES - first_count  # 10
-        return lines[:first_count] + [TRUNCATION_INDICATOR] + lines[-last_count:]
-    
-    burn_lines.extend(apply_truncation(data_burn_lines))
     if cumulative:
-        supply_lines.extend(apply_truncation(data_supply_lines))
+        burns = burn_analytics.cumulative_burns(closes, days, today_supply)
+        today_integral = float(today_supply).is_integer()
+        for rows in (head, tail):
+            if rows is tail and tail:
+                data_burn_lines.append(TRUNCATION_INDICATOR)
+                data_supply_lines.append(TRUNCATION_INDICATOR)
+            for i in rows:
+                label = period_label(i)
+                if not burns.valid[i]:
+                    data_burn_lines.append(f"{label}: No data")
+                    data_supply_lines.append(f"{label}: No data")
+                    continue
+                burned = number(burns.burned[i], burns.integral[i] and today_integral)
+                data_burn_lines.append(format_burn_line(label, burned, float(burns.pct[i])))
+                data_supply_lines.append(format_supply_line(label, number(burns.old_supply[i], burns.integral[i])))
+    else:
+        burns = burn_analytics.daily_burns(closes, days)
+        for rows in (head, tail):
+            if rows is tail and tail:
+                data_burn_lines.append(TRUNCATION_INDICATOR)
+            for i in rows:
+                label = period_label(i)
+                if not burns.valid[i]:
+                    data_burn_lines.append(f"{label}: No data")
+                    continue
+                burned = number(burns.burned[i], burns.integral[i])
+                data_burn_lines.append(format_burn_line(label, burned, float(burns.pct[i])))
+
+        count = burns.count
+        total_burned = burns.total
+        total_pct = burns.total_pct
+        if burns.max_index is not None:
+            max_burned = burns.burned[burns.max_index]
+            max_burned_pct = float(burns.pct[burns.max_index])
+            max_burned_date = today - timedelta(days=int(days[burns.max_index]))
+
+    burn_lines.extend(data_burn_lines)
+    if cumulative:
+        supply_lines.extend(data_supply_lines)
 
 
     if not cumulative and count > 0:
@@ -1011,7 +1734,7 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
         burn_lines.append(" " * padding + days_text)
         
         # Show Max line with the highest burn day
-        if max_burned > 0 and max_burned_date:
+        if burns.max_index is not None:
             burn_lines.append("")
             burn_lines.append(format_burn_line("Max", int(max_burned), max_burned_pct))
             # Add date in parentheses
@@ -1020,183 +1743,249 @@ async def _handle_burn_impl(message: Message, cumulative: bool):
             burn_lines.append(" " * padding + date_text)
 
     if cumulative:
-        await message.reply(code_block("\n".join(burn_lines + [""] + supply_lines)),
-                            parse_mode="MarkdownV2")
+        reply_text = code_block("\n".join(burn_lines + [""] + supply_lines))
     else:
-        await message.reply(code_block("\n".join(burn_lines)),
-                            parse_mode="MarkdownV2")
+        reply_text = code_block("\n".join(burn_lines))
+    metrics.record_stage("render", time.perf_counter() - render_start)
+
+    reply(message, reply_text, parse_mode="MarkdownV2")
 
+@metrics.instrument("burnt")
 async def handle_burnt_command(message: Message):
     """Handle /burnt command - shows cumulative burn since a specific day."""
     await _handle_burn_impl(message, cumulative=True)
 
+@metrics.instrument("burn")
 async def handle_burn_command(message: Message):
     """Handle /burn command - shows daily burn on specific days."""
     await _handle_burn_impl(message, cumulative=False)
 
 async def handle_burnd_command(message: Message):
     """Handle deprecated /burnd command - redirect to /burn with message."""
-    await message.reply("/burnd has been renamed to just /burn.\nUse /burnt for cumulative burn.")
+    reply(message, "/burnd has been renamed to just /burn.\nUse /burnt for cumulative burn.")
 # ---------------------------------------------------
 # MAIN
 # ---------------------------------------------------
 
+@metrics.instrument("drag")
 async def handle_drag_command(message: Message):
-    async with DATA_LOCK:
-        # Skip messages sent before bot started
-        message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
-        if message_ts < BOT_START_TIME:
-            return
-
-        if message.chat.username == ALLOWED_CHAT_USERNAME:
-            await message.reply("⚠️ DM bot directly to check dragon status, to avoid spam.\nAttack here with /sup.")
-            return
-
-        user = message.from_user
-        username = (
-            user.full_name
-            or user.first_name
-            or user.username
-            or f"User{user.id}"
-        )
-
-        data = load_data()
-
-        if username not in data['players']:
-            data['players'][username] = {'damage': 0, 'last_attack': None}
+    # Skip messages sent before bot started
+    message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
+    if message_ts < BOT_START_TIME:
+        return
 
-        player = data['players'][username]
+    chat_key = SHARDS.chat_key(message.chat)
+    if chat_key is not None:
+        reply(message, "⚠️ DM bot directly to check dragon status, to avoid spam.\nAttack here with /sup.", priority=PRIORITY_NOTICE)
+        return
 
-        if message.chat.username == ALLOWED_CHAT_USERNAME:
-            # Check per-user cooldown
-            cd = get_cooldown_remaining(player['last_attack'])
-            if cd > 0:
-                await message.reply(f"⏳ You can check status again in: *{format_time(cd)}*", parse_mode="Markdown")
-                return
+    user = message.from_user
+    username = (
+        user.full_name
+        or user.first_name
+        or user.username
+        or f"User{user.id}"
+    )
+
+    # DMs show the original chat's boss
+    shard = await SHARDS.get(ALLOWED_CHAT_USERNAME)
+    state = shard.state
+
+    if chat_key is not None:
+        # Check per-user cooldown
+        cd = state.cooldowns.user_remaining(username)
+        if cd > 0:
+            reply(message, f"⏳ You can check status again in: *{format_time(cd)}*", parse_mode="Markdown", priority=PRIORITY_NOTICE)
+            return
 
+    # Fetch outside the lock so other commands don't queue behind the backend
+    with metrics.stage("fetch"):
         current_supply = await get_gns_total_supply()
-        if current_supply is None:
-            await message.reply("❌ Failed to fetch GNS supply. Try again later.")
-            return
+    if current_supply is None:
+        reply(message, "❌ Failed to fetch GNS supply. Try again later.", priority=PRIORITY_NOTICE)
+        return
+
+    async with data_lock(shard, "drag"):
+        data = state.data
+        initializing = data['last_supply'] is None
 
         # Trigger per-user cooldown
-        player['last_attack'] = time.time()
-        
-        if data['last_supply'] is None:
-            data['last_supply'] = current_supply
-            save_data(data)
-            await message.reply(
-                f"🎮 *BOSS BATTLE STATUS*\n\n🐉 HP: *{current_supply:,}*",
-                parse_mode="Markdown"
-            )
-            return
-            
-        save_data(data)
-
-        supplarius = format_supplarius(
-            current_supply,
-            data['recent_damages'],
-            data['last_attacker'],
-            data['last_damage'],
-            data['players'],
-            crossed_million=False,
-            from_status=True
+        state.record("status", user=username, supply=current_supply)
+
+        if not initializing:
+            with metrics.stage("render"):
+                supplarius = format_supplarius(
+                    current_supply,
+                    data['recent_damages'],
+                    data['last_attacker'],
+                    data['last_damage'],
+                    data['players'],
+                    crossed_million=False,
+                    from_status=True
+                )
+
+    if initializing:
+        reply(
+            message,
+            f"🎮 *BOSS BATTLE STATUS*\n\n🐉 HP: *{current_supply:,}*",
+            parse_mode="Markdown"
         )
-        await message.reply(code_block(supplarius), parse_mode="MarkdownV2")
+        return
 
-async def handle_wha_command(message: Message):
-    async with DATA_LOCK:
-        print("Wha command detected")
+    reply(message, code_block(supplarius), parse_mode="MarkdownV2")
 
-        # Skip messages sent before bot started
-        message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
+def apply_wha_attack(state, username, current_whale_gns, balance_age):
+    """Apply a /wha attack for a polled whale balance. Call with the chat's lock held.
 
-        if message_ts < BOT_START_TIME:
-            print("Ignoring stale message")
-            return  # ignore old messages
+    Returns:
+        (reply text, parse mode, frame) tuple, frame being the format_whale
+        arguments of the whale after the attack. In LIVE_BOARD mode the
+        reply is a one-line ack (plus the balance age) and the frame is
+        left to the live board to render.
+    """
+    data = state.data
+    age_line = f"\n🕒 Balance read {format_time(balance_age)} ago"
 
-        if message.chat.username != ALLOWED_CHAT_USERNAME:
-            await message.reply("⚠️ This command can only be used in @GainsPriceChat")
-            return
+    # Check if whale is defeated
+    defeated = current_whale_gns <= 0
 
-        user = message.from_user
-        username = (
-            user.full_name
-            or user.first_name
-            or user.username
-            or f"User{user.id}"
+    if data['whale_last_supply'] is None:
+        # First time initialization
+        state.record("init", boss="whale", user=username, supply=current_whale_gns)
+        return (
+            f"🎮 *WHALE BOSS BATTLE INITIALIZED!*\n\n🐋 GNS: *{current_whale_gns:,.2f}*\nAttack again to deal damage!" + age_line,
+            "Markdown",
+            whale_frame(data, show_full=True, defeated=defeated)
         )
 
-        data = load_data()
+    damage = data['whale_last_supply'] - current_whale_gns
+    
+    # Normal attack logic
+    show_full = data['whale_first_attack']
+    state.record("whale_hit", boss="whale", user=username, damage=damage, supply=current_whale_gns)
+    frame = whale_frame(data, show_full=show_full, defeated=defeated)
 
-        # Check whale-specific global cooldown FIRST - blocks all actions
-        if data['whale_last_global_attack'] is not None:
-            elapsed = time.time() - data['whale_last_global_attack']
-            global_cd = max(0, GLOBAL_COOLDOWN_HOURS * 3600 - elapsed)
-            if global_cd > 0:
-                await message.reply(f"⏳ You can attack the whale again in: *{format_time(global_cd)}*", parse_mode="Markdown")
-                return
+    if LIVE_BOARD:
+        return format_attack_ack("whale", data, username) + age_line, None, frame
 
-        if username not in data['players']:
-            data['players'][username] = {'damage': 0, 'last_attack': None}
+    with metrics.stage("render"):
+        whale_display = format_whale(*frame)
+    return code_block(whale_display) + age_line, "MarkdownV2", frame
 
-        player = data['players'][username]
+@metrics.instrument("wha")
+async def handle_wha_command(message: Message):
+    print("Wha command detected")
 
-        current_whale_gns = await get_whale_gns()
-        if current_whale_gns is None:
-            await message.reply("❌ Failed to fetch whale GNS balance. Try again later.")
-            return
+    # Skip messages sent before bot started
+    message_ts = message.date.replace(tzinfo=timezone.utc).timestamp()
 
-        # Check if whale is defeated
-        defeated = current_whale_gns <= 0
+    if message_ts < BOT_START_TIME:
+        print("Ignoring stale message")
+        return  # ignore old messages
 
-        if data['whale_last_supply'] is None:
-            # First time initialization
-            data['whale_last_supply'] = current_whale_gns
-            data['whale_first_attack'] = True
-            save_data(data)
-            await message.reply(
-                f"🎮 *WHALE BOSS BATTLE INITIALIZED!*\n\n🐋 GNS: *{current_whale_gns:,.2f}*\nAttack again to deal damage!",
-                parse_mode="Markdown"
-            )
-            return
+    chat_key = SHARDS.chat_key(message.chat)
+    if chat_key is None:
+        reply(message, only_in_allowed_chats_text(), priority=PRIORITY_NOTICE)
+        return
 
-        damage = data['whale_last_supply'] - current_whale_gns
-        
-        # Normal attack logic
-        data['whale_recent_damages'].append((damage, username))
-        data['whale_last_attacker'] = username
-        data['whale_last_damage'] = damage
-        data['whale_last_global_attack'] = time.time()
+    user = message.from_user
+    username = (
+        user.full_name
+        or user.first_name
+        or user.username
+        or f"User{user.id}"
+    )
+
+    shard = await SHARDS.get(chat_key)
+    state = shard.state
+
+    # Check whale-specific global cooldown FIRST - blocks all actions.
+    # Answered from the cooldown index, without waiting for the lock.
+    seen_seq = state.seq
+    global_cd = state.cooldowns.global_remaining("whale")
+    if global_cd > 0:
+        reply(message, f"⏳ You can attack the whale again in: *{format_time(global_cd)}*", parse_mode="Markdown", priority=PRIORITY_NOTICE)
+        return
 
-        if damage > 0:
-            player['damage'] += damage
+    # Use the polled balance; scrape (outside the lock) only if it is too old
+    with metrics.stage("scrape"):
+        current_whale_gns, balance_age = await WHALE_BALANCE.get(WHALE_MAX_AGE_SES)
+    if current_whale_gns is None:
+        reply(message, "❌ Failed to fetch whale GNS balance. Try again later.", priority=PRIORITY_NOTICE)
+        return
 
-        show_full = data['whale_first_attack']
-        data['whale_first_attack'] = False
-        data['whale_last_supply'] = current_whale_gns
-        save_data(data)
-
-        whale_display = format_whale(
-            current_whale_gns,
-            data['whale_recent_damages'],
-            data['whale_last_attacker'],
-            data['whale_last_damage'],
-            data['players'],
-            show_full=show_full,
-            defeated=defeated
-        )
+    async with data_lock(shard, "wha"):
+        if state.seq != seen_seq:
+            # Someone else changed the state while we were scraping: validate again
+            metrics.inc("optimistic_conflicts", handler="wha")
+            global_cd = state.cooldowns.global_remaining("whale")
+        if global_cd <= 0:
+            text, parse_mode, frame = apply_wha_attack(state, username, current_whale_gns, balance_age)
 
-        await message.reply(code_block(whale_display), parse_mode="MarkdownV2")
+    if global_cd > 0:
+        reply(message, f"⏳ You can attack the whale again in: *{format_time(global_cd)}*", parse_mode="Markdown", priority=PRIORITY_NOTICE)
+        return
 
+    reply(message, text, parse_mode=parse_mode, priority=PRIORITY_RESULT)
+    if LIVE_BOARD:
+        live_board(shard, message.chat.id, "whale", message.bot).schedule(frame)
+
+def format_duration(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+def format_perf_report():
+    """Per-handler latency (p50/p95) with the stage breakdown, then all counters."""
+    commands = {dict(labels)['handler']: h for (name, labels), h in metrics.histograms.items() if name == "command_seconds"}
+    stages = {}
+    for (name, labels), histogram in metrics.histograms.items():
+        if name == "stage_seconds":
+            labels = dict(labels)
+            stages.setdefault(labels['handler'], {})[labels['stage']] = histogram
+    errors = {dict(labels)['handler']: n for (name, labels), n in metrics.counters.items() if name == "command_errors_total"}
+
+    lines = ["PERF since start (p50 / p95)"]
+    for handler in sorted(set(commands) | set(stages), key=lambda h: (h not in commands, h)):
+        lines.append("")
+        rows = []
+        if handler in commands:
+            total = commands[handler]
+            lines.append(f"/{handler}  n={total.count}  errors={errors.get(handler, 0)}")
+            rows.append(("total", total))
+        else:
+            lines.append(handler)
+        rows.extend(sorted(stages.get(handler, {}).items()))
+        for stage, histogram in rows:
+            lines.append(
+                f"  {stage:<10} {format_duration(histogram.quantile(0.5)):>8} {format_duration(histogram.quantile(0.95)):>8}"
+            )
 
-async def main():
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not token:
-        print("Error: TELEGRAM_BOT_TOKEN not set")
+    other = [
+        (name, labels, value) for (name, labels), value in sorted(metrics.counters.items())
+        if name not in ("commands_total", "command_errors_total")
+    ]
+    if other:
+        lines.append("")
+        for name, labels, value in other:
+            label_str = ",".join(str(v) for _, v in labels)
+            lines.append(f"{name}{f'[{label_str}]' if label_str else ''}: {value}")
+    return "\n".join(lines)
+
+async def handle_perf_command(message: Message):
+    """Admin-only latency report (ADMIN_USER_IDS)."""
+    if message.from_user is None or message.from_user.id not in ADMIN_USER_IDS:
         return
+    reply(message, code_block(format_perf_report()), parse_mode="MarkdownV2")
+
+
+def create_bot(token):
+    session = None
+    if TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+    return Bot(token, session=session)
 
-    bot = Bot(token)
+def create_dispatcher():
     dp = Dispatcher()
 
     dp.message.register(handle_sup_command, F.text.startswith("/sup"))
@@ -1206,9 +1995,96 @@ async def main():
     dp.message.register(handle_burnd_command, Command("burnd"))  # deprecated, shows message
     dp.message.register(handle_burnt_command, Command("burnt"))
     dp.message.register(handle_burn_command, Command("burn"))
+    dp.message.register(handle_perf_command, Command("perf"))
+    return dp
+
+async def start_webhook(bot, dp):
+    """Serve Telegram updates on WEBHOOK_HOST:WEBHOOK_PORT and point the bot's webhook at it.
+
+    Updates without the right secret token are rejected with 401. Each
+    update is acknowledged at once and handled in the background; replies
+    go out as regular Bot API calls.
 
-    print("🤖 GNS Supply Boss Bot running...")
-    await dp.start_polling(bot, skip_updates=True)
+    Returns:
+        The aiohttp AppRunner; call its cleanup() to stop serving
+    """
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+
+    await bot.set_webhook(
+        WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=True,
+    )
+    return runner
+
+async def main():
+    global http_client
+    token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not token:
+        print("Error: TELEGRAM_BOT_TOKEN not set")
+        return
+    if GMUD_MODE not in ("polling", "webhook"):
+        print(f"Error: unknown GMUD_MODE {GMUD_MODE!r} (use polling or webhook)")
+        return
+    if GMUD_MODE == "webhook" and not (WEBHOOK_URL and WEBHOOK_SECRET):
+        print("Error: webhook mode needs WEBHOOK_URL and WEBHOOK_SECRET")
+        return
+
+    bot = create_bot(token)
+    dp = create_dispatcher()
+
+    http_client = create_http_client()
+    get_game_state()  # Load the original chat up front; other chats load on their first command
+    OUTBOX.start()
+    flusher = asyncio.create_task(state_flusher())
+    whale_refresher = asyncio.create_task(whale_poller())
+    supply_refresher = asyncio.create_task(supply_poller())
+    metrics_server = None
+    if METRICS_PORT:
+        metrics_server = await metrics.start_server(METRICS_HOST, METRICS_PORT)
+        print(f"Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    webhook_server = None
+    print(f"🤖 GNS Supply Boss Bot running ({GMUD_MODE})...")
+    try:
+        if GMUD_MODE == "webhook":
+            webhook_server = await start_webhook(bot, dp)
+            print(f"Webhook listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+            await asyncio.Event().wait()
+        else:
+            # getUpdates is refused while a webhook (left by webhook mode) is set
+            await bot.delete_webhook()
+            # The session stays open for the replies still queued in OUTBOX
+            await dp.start_polling(bot, skip_updates=True, close_bot_session=False)
+    finally:
+        if webhook_server is not None:
+            await webhook_server.cleanup()
+        board_updates = [task for shard in SHARDS.shards.values() for task in shard.board_updates()]
+        if board_updates:
+            # Let debounced board edits reach the outbox before it drains
+            await asyncio.wait(board_updates, timeout=OUTBOX_DRAIN_SES)
+        try:
+            await OUTBOX.drain(OUTBOX_DRAIN_SES)
+        except asyncio.TimeoutError:
+            print(f"Shutting down with {len(OUTBOX.queue)} replies unsent")
+        await OUTBOX.stop()
+        await bot.session.close()
+        flusher.cancel()
+        whale_refresher.cancel()
+        supply_refresher.cancel()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await SHARDS.flush_all()
+        SHARDS.close_all()
+        await close_http_client()
+        close_supply_series()
+        await asyncio.get_running_loop().run_in_executor(BROWSER_EXECUTOR, close_browsers)
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Incrementally maintained damage ranking for the leaderboard."""
+from bisect import bisect_left, insort
+
+
+class Leaderboard:
+    """Players ranked by total damage, kept sorted as damage changes.
+
+    Entries are (-damage, order, name) tuples in a sorted list, where order
+    is the position the player was first seen at, so ties rank the same way
+    sorting the players dict by damage does. A name index finds a player's
+    entry, so an update is two binary searches and one list insert instead
+    of re-sorting every player.
+    """
+
+    def __init__(self, players=None):
+        self.entries = []
+        self.by_name = {}
+        self.next_order = 0
+        for name, player in (players or {}).items():
+            entry = (-player['damage'], self.next_order, name)
+            self.entries.append(entry)
+            self.by_name[name] = entry
+            self.next_order += 1
+        self.entries.sort()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, name, damage):
+        entry = self.by_name.get(name)
+        if entry is not None:
+            if entry[0] == -damage:
+                return
+            del self.entries[bisect_left(self.entries, entry)]
+            order = entry[1]
+        else:
+            order = self.next_order
+            self.next_order += 1
+
+        entry = (-damage, order, name)
+        insort(self.entries, entry)
+        self.by_name[name] = entry
+
+    def top(self, k):
+        """Return the k highest (name, damage) pairs."""
+        return self.slice(0, k)
+
+    def slice(self, start, stop):
+        """Return (name, damage) pairs for ranks start+1 .. stop."""
+        return [(name, -neg_damage) for neg_damage, _, name in self.entries[start:stop]]
+
+    def rank(self, name):
+        """Return the 1-based rank of a player, or None if unknown."""
+        entry = self.by_name.get(name)
+        if entry is None:
+            return None
+        return bisect_left(self.entries, entry) + 1
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""A pinned boss board that is edited in place instead of re-posted."""
+import asyncio
+
+from aiogram.exceptions import TelegramBadRequest
+
+import metrics
+from outbox import PRIORITY_INFO
+
+# Edit errors meaning the board message is gone for good; anything else is retried on the next update
+BOARD_GONE_ERRORS = ("message to edit not found", "message can't be edited")
+BOARD_GONE = "gone"
+
+
+class LiveBoard:
+    """One chat's board for one boss, kept up to date with edit_message_text.
+
+    schedule(frame) asks for the board to show frame, a snapshot of the
+    boss taken when it changed. All requests made within debounce_ses of
+    the first one become a single edit showing the latest frame.
+    render(frame) returns (text, parse mode). Text that is already shown
+    is not sent again.
+    If no board exists yet, or Telegram reports the old one deleted or no
+    longer editable, a new message is posted and pinned, and
+    on_posted(message_id) is called so the caller can store its id. Any
+    other failed edit keeps the board as it is; the next schedule() tries
+    again.
+
+    Edits, posts and pins go through the outbox at PRIORITY_INFO, so they
+    count against the chat's flood limits like any other message.
+    """
+
+    def __init__(self, bot, outbox, chat_id, render, message_id, on_posted, debounce_ses):
+        self.bot = bot
+        self.outbox = outbox
+        self.chat_id = chat_id
+        self.render = render
+        self.message_id = message_id
+        self.on_posted = on_posted
+        self.debounce_ses = debounce_ses
+        self.shown = None
+        self.frame = None
+        self.requested = False
+        self.pending = None
+
+    def schedule(self, frame):
+        self.frame = frame
+        self.requested = True
+        if self.pending is None or self.pending.done():
+            self.pending = asyncio.create_task(self._refresh_later())
+        else:
+            metrics.inc("board_updates_coalesced_total")
+
+    async def _refresh_later(self):
+        # Changes made while an edit is on its way get one more edit after it
+        while self.requested:
+            await asyncio.sleep(self.debounce_ses)
+            self.requested = False
+            await self.refresh()
+
+    async def refresh(self):
+        if self.frame is None:
+            return
+        rendered = self.render(self.frame)
+        if rendered == self.shown:
+            metrics.inc("board_edits_skipped_total")
+            return
+        text, parse_mode = rendered
+
+        if self.message_id is not None:
+            edited = await self.outbox.send(self.chat_id, lambda: self._edit(text, parse_mode), PRIORITY_INFO)
+            if edited is None:
+                # Network error, flood waits used up or dropped from the outbox
+                metrics.inc("board_edit_failures_total")
+                return
+            if edited is not BOARD_GONE:
+                metrics.inc("board_edits_total")
+                self.shown = rendered
+                return
+            print(f"Board {self.message_id} in chat {self.chat_id} is gone, posting a new one")
+
+        sent = await self.outbox.send(
+            self.chat_id, lambda: self.bot.send_message(self.chat_id, text, parse_mode=parse_mode), PRIORITY_INFO
+        )
+        if sent is None:
+            return
+        metrics.inc("board_posts_total")
+        self.message_id = sent.message_id
+        self.shown = rendered
+        self.on_posted(sent.message_id)
+        self.outbox.send(
+            self.chat_id,
+            lambda: self.bot.pin_chat_message(self.chat_id, sent.message_id, disable_notification=True),
+            PRIORITY_INFO,
+        )
+
+    async def _edit(self, text, parse_mode):
+        try:
+            return await self.bot.edit_message_text(
+                text, chat_id=self.chat_id, message_id=self.message_id, parse_mode=parse_mode
+            )
+        except TelegramBadRequest as e:
+            # Already showing this text, e.g. after a restart
+            if "message is not modified" in str(e):
+                return True
+            if any(error in str(e) for error in BOARD_GONE_ERRORS):
+                return BOARD_GONE
+            raise
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""In-process metrics: labelled counters and latency histograms.
+
+Handlers wrapped with instrument() time themselves and label every
+stage() timed underneath them with the handler name, so the breakdown of
+one command (lock wait, fetch, render, reply, ...) needs no plumbing.
+Everything is served in the Prometheus text format by start_server().
+"""
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiohttp import web
+
+# Upper bounds in seconds, from lock waits (microseconds) up to slow scrapes
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+counters = {}
+histograms = {}
+
+# Handler label for stage() timings; background tasks set their own name
+current_handler = ContextVar("current_handler", default="background")
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+
+def get_histogram(name, **labels):
+    """The histogram for name and labels, or None if nothing was observed yet."""
+    return histograms.get(_key(name, labels))
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = Histogram()
+    histogram.observe(value)
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def record_stage(name, seconds):
+    observe("stage_seconds", seconds, handler=current_handler.get(), stage=name)
+
+
+@contextmanager
+def stage(name):
+    """Time one stage of the current handler (see instrument())."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def instrument(name):
+    """Decorator for command handlers: counts and times every call under name."""
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            token = current_handler.set(name)
+            inc("commands_total", handler=name)
+            try:
+                with timer("command_seconds", handler=name):
+                    return await handler(*args, **kwargs)
+            except Exception:
+                inc("command_errors_total", handler=name)
+                raise
+            finally:
+                current_handler.reset(token)
+        return wrapper
+    return decorate
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render_prometheus():
+    """All counters and histograms in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def start_server(host, port):
+    """Serve /metrics on host:port. Returns the runner; call its cleanup() to stop."""
+    async def handle_metrics(request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Outbound Telegram message queue that stays inside the Bot API flood limits."""
+import asyncio
+import time
+from bisect import insort
+from contextvars import copy_context
+from itertools import count
+
+from aiogram.exceptions import TelegramRetryAfter
+
+import metrics
+
+# Lower sends first: attack results go out before informational replies and cooldown notices
+PRIORITY_RESULT = 0
+PRIORITY_INFO = 1
+PRIORITY_NOTICE = 2
+
+PRUNE_SES = 60  # How often buckets of quiet chats and expired pauses are dropped
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class OutgoingMessage:
+    def __init__(self, chat_id, send, priority, seq):
+        self.chat_id = chat_id
+        self.send = send
+        self.priority = priority
+        self.seq = seq
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.future = asyncio.get_running_loop().create_future()
+        # Handler label for the reply timing, captured where the reply was queued
+        self.context = copy_context()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Outbox:
+    """Priority queue of outbound sends, drained by one worker task.
+
+    Every send needs a token from its chat's bucket and from the global
+    bucket. Private chats and groups have separate per-chat rates, matching
+    Telegram's limits. The most urgent message that can go out now is sent
+    first, so a chat that has used up its budget does not hold back other
+    chats. Each chat has at most one send in flight, so its messages arrive
+    in the order the queue chose. A TelegramRetryAfter pauses that chat for the requested time
+    and queues the message again, up to max_retries times. When the queue
+    is full, the least urgent message is dropped.
+    """
+
+    def __init__(self, chat_rate, group_rate, chat_burst, global_rate, global_burst, max_queue, max_retries):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.queue = []
+        self.buckets = {}
+        self.paused_until = {}
+        self.seq = count()
+        self.in_flight = 0
+        self.deliveries = set()  # Send tasks, referenced until done
+        self.sending = set()  # Chats with a send in flight
+        self.pruned_at = time.monotonic()
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.worker = None
+
+    def _bucket(self, chat_id):
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat ids are groups and channels
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self.buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop sending; everything still queued or being sent resolves to None."""
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        for task in self.deliveries:
+            task.cancel()
+        await asyncio.gather(*self.deliveries, return_exceptions=True)
+        for item in self.queue:
+            item.future.set_result(None)
+        self.queue = []
+        self.idle.set()
+
+    async def drain(self, timeout=None):
+        """Wait until everything queued so far has been sent (or given up on)."""
+        await asyncio.wait_for(self.idle.wait(), timeout)
+
+    def send(self, chat_id, send, priority=PRIORITY_INFO):
+        """Queue send (a zero-argument coroutine function) for chat_id.
+
+        Returns a future of send's result, or of None if the message was
+        dropped or could not be sent.
+        """
+        self.start()
+        item = OutgoingMessage(chat_id, send, priority, next(self.seq))
+        if len(self.queue) >= self.max_queue:
+            dropped = self.queue[-1] if self.queue and item < self.queue[-1] else item
+            metrics.inc("outbox_dropped_total")
+            print(f"Outbox full, dropping a message to {dropped.chat_id}")
+            dropped.future.set_result(None)
+            if dropped is item:
+                return item.future
+            self.queue.pop()
+        self._enqueue(item)
+        return item.future
+
+    def _enqueue(self, item):
+        insort(self.queue, item)
+        self.idle.clear()
+        self.wakeup.set()
+
+    def _next_ready(self, now):
+        """The most urgent message allowed out now, else (None, seconds until one may be)."""
+        wait = self.global_bucket.delay(now)
+        if wait > 0:
+            return None, wait
+        wait = None
+        for item in self.queue:
+            if item.chat_id in self.sending:
+                continue
+            ready_in = max(self._bucket(item.chat_id).delay(now), self.paused_until.get(item.chat_id, 0) - now)
+            if ready_in <= 0:
+                return item, 0
+            wait = ready_in if wait is None else min(wait, ready_in)
+        return None, wait
+
+    def _prune(self, now):
+        """Forget chats with a full bucket and nothing queued or in flight, and pauses that are over."""
+        busy = {item.chat_id for item in self.queue} | self.sending
+        for chat_id, bucket in list(self.buckets.items()):
+            if chat_id not in busy and bucket.full(now):
+                del self.buckets[chat_id]
+        for chat_id, until in list(self.paused_until.items()):
+            if until <= now:
+                del self.paused_until[chat_id]
+        self.pruned_at = now
+
+    async def run(self):
+        while True:
+            now = time.monotonic()
+            if now - self.pruned_at >= PRUNE_SES:
+                self._prune(now)
+            item, wait = self._next_ready(now)
+            if item is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.queue.remove(item)
+            self.global_bucket.take(now)
+            self._bucket(item.chat_id).take(now)
+            self.in_flight += 1
+            self.sending.add(item.chat_id)
+            task = asyncio.create_task(self._deliver(item))
+            self.deliveries.add(task)
+            task.add_done_callback(self.deliveries.discard)
+
+    async def _deliver(self, item):
+        try:
+            metrics.observe("outbox_queue_seconds", time.monotonic() - item.queued_at)
+            item.attempts += 1
+            result = await item.send()
+        except TelegramRetryAfter as e:
+            metrics.inc("outbox_retry_after_total")
+            if item.attempts > self.max_retries:
+                print(f"Giving up on a message to {item.chat_id} after {item.attempts} flood waits")
+                metrics.inc("outbox_failures_total", reason="retry_after")
+                item.future.set_result(None)
+                return
+            print(f"Flood limit in chat {item.chat_id}, pausing it for {e.retry_after}s")
+            self.paused_until[item.chat_id] = time.monotonic() + e.retry_after
+            self._enqueue(item)
+            return
+        except asyncio.CancelledError:
+            item.future.set_result(None)
+            raise
+        except Exception as e:
+            print(f"Error sending message to {item.chat_id}: {e}")
+            metrics.inc("outbox_failures_total", reason=type(e).__name__)
+            item.future.set_result(None)
+            return
+        finally:
+            self.in_flight -= 1
+            self.sending.discard(item.chat_id)
+            self.wakeup.set()
+            if not self.queue and not self.in_flight:
+                self.idle.set()
+
+        metrics.inc("outbox_sent_total")
+        item.context.run(metrics.record_stage, "reply", time.monotonic() - item.queued_at)
+        item.future.set_result(result)
@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+import os
 import re
+import threading
+import time
 
-URL = "https://debank.com/profile/0x4df1cc7459fd074cbc6aa8803cceaee561812fbe"
+WALLET = "0x4df1cc7459fd074cbc6aa8803cceaee561812fbe"
+URL = f"https://debank.com/profile/{WALLET}"
 
+BROWSER_POOL_SIZE = 1  # Browsers kept alive; also the number of scraper threads
+BROWSER_MAX_USES = 50  # Recycle a browser after this many scrapes
+BROWSER_MAX_RSS_MB = 700  # Recycle a browser once Firefox grows past this
 
-def get_gns_amount():
+
+def create_driver():
     options = webdriver.FirefoxOptions()
     options.add_argument('--headless')
     options.set_preference('permissions.default.image', 2)  # blokuj obrazki
@@ -17,27 +27,169 @@ def get_gns_amount():
     options.set_preference('media.volume_scale', '0.0')
     options.page_load_strategy = 'eager'  # nie czekaj na pełne załadowanie
 
-    driver = webdriver.Firefox(options=options)
+    return webdriver.Firefox(options=options)
 
-    try:
+
+def read_gns_amount(driver):
+    # A warm session already has the profile open, so a refresh is enough
+    if driver.current_url.rstrip('/') == URL:
+        driver.refresh()
+    else:
         driver.get(URL)
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.LINK_TEXT, "GNS"))
-        )
-
-        gns_link = driver.find_element(By.LINK_TEXT, "GNS")
-        row = gns_link.find_element(By.XPATH, "./ancestor::div[contains(@class,'db-table-row')]")
-        cells = row.find_elements(By.CLASS_NAME, "db-table-cell")
-
-        for cell in cells:
-            text = cell.text.strip()
-            if re.match(r'^[\d,]+\.\d+$', text):
-                return text.replace(',', '')
-    finally:
-        driver.quit()
+
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.LINK_TEXT, "GNS"))
+    )
+
+    gns_link = driver.find_element(By.LINK_TEXT, "GNS")
+    row = gns_link.find_element(By.XPATH, "./ancestor::div[contains(@class,'db-table-row')]")
+    cells = row.find_elements(By.CLASS_NAME, "db-table-cell")
+
+    for cell in cells:
+        text = cell.text.strip()
+        if re.match(r'^[\d,]+\.\d+$', text):
+            return text.replace(',', '')
 
     return None
 
 
+def process_tree(pid):
+    """pid and all of its descendants, found by walking /proc by parent pid."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Exited while we were looking
+        # The command name is in parentheses and may contain spaces; ppid follows the state
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [pid]
+    for parent in tree:
+        tree.extend(children.get(parent, ()))
+    return tree
+
+
+def vmrss_kb(pid):
+    """Resident memory of one process in kB, or 0 if it is gone."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class BrowserSession:
+    def __init__(self):
+        self.driver = create_driver()
+        self.uses = 0
+        self.broken = False
+
+    def healthy(self):
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def rss_mb(self):
+        """Resident memory of Firefox and its content processes in MB, or 0 if unknown."""
+        pid = self.driver.capabilities.get("moz:processID")
+        if not pid:
+            return 0
+        return sum(vmrss_kb(p) for p in process_tree(int(pid))) / 1024
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException as e:
+            print(f"Error closing browser: {e}")
+
+
+class BrowserPool:
+    """Long-lived headless browsers shared by scrapes.
+
+    Scrapes run on BROWSER_EXECUTOR, which has one thread per browser, so
+    at most BROWSER_POOL_SIZE browsers exist at once and extra requests
+    wait in the executor queue. Sessions are health-checked before use and
+    recycled after BROWSER_MAX_USES scrapes or once they grow past
+    BROWSER_MAX_RSS_MB.
+    """
+
+    def __init__(self, max_uses, max_rss_mb):
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.idle = []
+        self.lock = threading.Lock()
+        self.created = 0
+        self.recycled = 0
+
+    def checkout(self):
+        while True:
+            with self.lock:
+                session = self.idle.pop() if self.idle else None
+            if session is None:
+                self.created += 1
+                return BrowserSession()
+            if session.healthy():
+                return session
+            print("Browser session unhealthy, replacing it")
+            self.recycled += 1
+            session.quit()
+
+    def checkin(self, session):
+        session.uses += 1
+        if session.broken or session.uses >= self.max_uses or session.rss_mb() > self.max_rss_mb:
+            self.recycled += 1
+            session.quit()
+            return
+        with self.lock:
+            self.idle.append(session)
+
+    def close(self):
+        with self.lock:
+            sessions, self.idle = self.idle, []
+        for session in sessions:
+            session.quit()
+
+
+BROWSER_POOL = BrowserPool(BROWSER_MAX_USES, BROWSER_MAX_RSS_MB)
+BROWSER_EXECUTOR = ThreadPoolExecutor(max_workers=BROWSER_POOL_SIZE, thread_name_prefix="scraper")
+
+
+def get_gns_amount(deadline=None):
+    """Read the whale's GNS balance using a pooled browser.
+
+    deadline is a time.monotonic() value; a request that waited in the
+    queue past it is dropped and returns None without touching a browser.
+    """
+    if deadline is not None and time.monotonic() > deadline:
+        print("Whale scrape expired in queue")
+        return None
+
+    session = BROWSER_POOL.checkout()
+    try:
+        return read_gns_amount(session.driver)
+    except WebDriverException:
+        session.broken = True
+        raise
+    finally:
+        BROWSER_POOL.checkin(session)
+
+
+def close_browsers():
+    BROWSER_POOL.close()
+
+
 if __name__ == '__main__':
-    print(get_gns_amount())
+    try:
+        print(get_gns_amount())
+    finally:
+        close_browsers()
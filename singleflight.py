@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Coalesce concurrent calls of the same upstream operation into one."""
+import asyncio
+
+import metrics
+
+
+class SingleFlight:
+    """Share one in-flight call among every caller that arrives while it runs.
+
+    The first caller starts fn() as a task; callers arriving before it
+    finishes await that same task instead of starting their own, so a burst
+    of commands costs one upstream request. Each caller waits through
+    asyncio.shield, so a cancelled caller does not cancel the call for the
+    others. Results and exceptions are shared; nothing is cached once the
+    call has finished.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.task = None
+        self.calls = 0
+        self.coalesced = 0
+
+    def in_flight(self):
+        return self.task is not None and not self.task.done()
+
+    async def do(self, fn):
+        if self.in_flight():
+            self.coalesced += 1
+            metrics.inc("singleflight_coalesced_total", key=self.name)
+        else:
+            self.calls += 1
+            metrics.inc("singleflight_calls_total", key=self.name)
+            self.task = asyncio.ensure_future(fn())
+            # Retrieve the exception even if every caller was cancelled meanwhile
+            self.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(self.task)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Durable storage for the game state: compacted snapshot + append-only event journal."""
+import json
+import os
+import sqlite3
+import threading
+
+
+class JsonStore:
+    """Game state stored as a JSON snapshot plus a JSON-lines event journal.
+
+    Every state change is appended to the journal as one line, so an attack
+    costs a small append instead of rewriting the whole file. The snapshot
+    is rewritten periodically (atomically, via a temp file and rename) and
+    records the sequence number and byte offset of the last event it
+    contains. On startup the snapshot is loaded and only the journal tail
+    after that offset is replayed. The journal itself is never truncated and
+    keeps the full event history.
+    """
+
+    def __init__(self, snapshot_path, journal_path, fsync=False):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.journal = None
+        self.offset = 0
+
+    def load_snapshot(self):
+        """Return the snapshot dict, or None if there is no snapshot yet."""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path, 'r') as f:
+            return json.load(f)
+
+    def read_events(self, after_seq, offset=0):
+        """Yield journal events with a sequence number above after_seq.
+
+        Reading starts at offset when it is still valid for the file. A
+        torn last line (crash mid-append) is cut off so new events start
+        on a clean line.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        size = os.path.getsize(self.journal_path)
+        if offset > size:
+            print(f"Journal offset {offset} beyond file size {size}, scanning from start")
+            offset = 0
+
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            good_offset = offset
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    break
+                good_offset += len(raw)
+                if event.get("seq", 0) > after_seq:
+                    yield event
+
+        if good_offset < size:
+            print(f"Dropping {size - good_offset} bytes of torn journal tail")
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    def open(self):
+        self.journal = open(self.journal_path, 'a')
+        self.offset = self.journal.tell()
+
+    def append(self, event):
+        if self.journal is None:
+            self.open()
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        self.journal.write(line)
+        self.journal.flush()
+        if self.fsync:
+            os.fsync(self.journal.fileno())
+        self.offset += len(line.encode())
+
+    def prepare_snapshot(self, data, seq):
+        """Serialize data together with the journal position it reflects.
+
+        Must run on the event loop so the copy matches the journal offset.
+        """
+        snapshot = dict(data, journal_seq=seq, journal_offset=self.offset)
+        return json.dumps(snapshot)
+
+    def write_snapshot(self, payload):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+
+class SqliteStore:
+    """Game state stored in SQLite (WAL mode) with the same interface as JsonStore.
+
+    Players live in their own table indexed by damage, and every event is a
+    row in an events table indexed by time and by boss, so leaderboard and
+    history queries can run offline without loading the whole state. The
+    remaining scalar fields are kept as JSON values in a meta table.
+
+    Events are committed one row at a time. Snapshots only rewrite players
+    touched since the previous snapshot plus the meta fields.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS players (
+                name TEXT PRIMARY KEY,
+                damage NUMERIC NOT NULL DEFAULT 0,
+                last_attack REAL
+            );
+            CREATE INDEX IF NOT EXISTS players_by_damage ON players(damage DESC);
+
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                type TEXT NOT NULL,
+                boss TEXT,
+                user TEXT,
+                damage NUMERIC,
+                supply NUMERIC,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_by_ts ON events(ts);
+            CREATE INDEX IF NOT EXISTS events_by_boss_ts ON events(boss, ts);
+
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self.touched = set()
+
+    def is_empty(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM meta) + (SELECT COUNT(*) FROM events)"
+            ).fetchone()
+        return row[0] == 0
+
+    def load_snapshot(self):
+        """Return the stored state as a dict, or None if the database is empty."""
+        with self.lock:
+            meta = self.conn.execute("SELECT key, value FROM meta").fetchall()
+            players = self.conn.execute(
+                "SELECT name, damage, last_attack FROM players ORDER BY rowid"
+            ).fetchall()
+        if not meta and not players:
+            return None
+
+        data = {key: json.loads(value) for key, value in meta}
+        data['players'] = {
+            name: {'damage': damage, 'last_attack': last_attack}
+            for name, damage, last_attack in players
+        }
+        return data
+
+    def read_events(self, after_seq, offset=0):
+        """Yield events with a sequence number above after_seq (offset is unused)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT payload FROM events WHERE seq > ? ORDER BY seq", (after_seq,)
+            ).fetchall()
+        for (payload,) in rows:
+            event = json.loads(payload)
+            if 'user' in event:
+                self.touched.add(event['user'])
+            yield event
+
+    def open(self):
+        pass
+
+    def append(self, event):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO events (seq, ts, type, boss, user, damage, supply, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    event['seq'],
+                    event['ts'],
+                    event['type'],
+                    event.get('boss'),
+                    event.get('user'),
+                    event.get('damage'),
+                    event.get('supply'),
+                    json.dumps(event, separators=(",", ":")),
+                ),
+            )
+            self.conn.commit()
+        if 'user' in event:
+            self.touched.add(event['user'])
+
+    def prepare_snapshot(self, data, seq):
+        """Copy the rows a snapshot needs. Must run on the event loop."""
+        # Walk players in insertion order so new rows keep the order ties sort by
+        players = [
+            (name, player['damage'], player['last_attack'])
+            for name, player in data['players'].items()
+            if name in self.touched
+        ]
+        self.touched = set()
+        meta = [(key, json.dumps(value)) for key, value in data.items() if key != 'players']
+        meta.append(('journal_seq', json.dumps(seq)))
+        return players, meta
+
+    def write_snapshot(self, payload):
+        players, meta = payload
+        try:
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT INTO players (name, damage, last_attack) VALUES (?, ?, ?)"
+                        " ON CONFLICT(name) DO UPDATE SET damage = excluded.damage,"
+                        " last_attack = excluded.last_attack",
+                        players,
+                    )
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta
+                    )
+        except Exception:
+            # Keep the rows for the next snapshot attempt
+            self.touched.update(name for name, _, _ in players)
+            raise
+
+    def import_state(self, data, seq, events):
+        """Copy a state loaded from another store (and its event history) into this one."""
+        for event in events:
+            self.append(event)
+        self.touched = set(data['players'])
+        self.write_snapshot(self.prepare_snapshot(data, seq))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Parsed, date-indexed view of the backend /stats supply history."""
+from collections import namedtuple
+from datetime import datetime
+
+SupplyRecord = namedtuple("SupplyRecord", ["dt", "token_supply", "entry"])
+
+
+def parse_entry_datetime(date_str):
+    return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+
+
+class SupplyHistory:
+    """Supply history parsed once and indexed by UTC date.
+
+    The API may return entries in inconsistent order, so for every date we
+    keep the entry with the latest timestamp, plus the overall latest entry.
+    All lookups are dictionary hits instead of rescans of the raw list.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.records = []
+        self.by_date = {}
+        self.latest = None
+
+        for e in entries:
+            date_str = e.get("date")
+            if not date_str:
+                continue
+
+            record = SupplyRecord(parse_entry_datetime(date_str), e["token_supply"], e)
+            self.records.append(record)
+
+            day = record.dt.date()
+            current = self.by_date.get(day)
+            if current is None or record.dt > current.dt:
+                self.by_date[day] = record
+
+            if self.latest is None or record.dt > self.latest.dt:
+                self.latest = record
+
+    def __len__(self):
+        return len(self.entries)
+
+    def latest_for_date(self, target_date):
+        """Return the entry dict with the latest timestamp on target_date, or None."""
+        record = self.by_date.get(target_date)
+        return record.entry if record else None
+
+    def overall_latest(self):
+        """Return the entry dict with the most recent timestamp, or None."""
+        return self.latest.entry if self.latest else None
+
+    def supply_on(self, target_date):
+        """Supply at the latest entry of target_date, or None if that day has no data."""
+        record = self.by_date.get(target_date)
+        return record.token_supply if record else None
+
+    def daily_closes(self):
+        """Return (date ordinals, supplies) of every day's latest entry."""
+        days = sorted(self.by_date)
+        return [day.toordinal() for day in days], [self.by_date[day].token_supply for day in days]
+
+    def current_supply(self, today):
+        entry = self.current_entry(today)
+        return entry["token_supply"] if entry else None
+
+    def current_entry(self, today):
+        """Prefer today's latest entry, fall back to the overall latest, then the first entry."""
+        return (
+            self.latest_for_date(today)
+            or self.overall_latest()
+            or (self.entries[0] if self.entries else None)
+        )
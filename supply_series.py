@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Local on-disk GNS supply time series with a materialized daily-close rollup."""
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from datetime import date, datetime, timezone
+
+# Both files are flat arrays of little-endian float64 pairs, so they can be
+# memory-mapped and read as one array without any parsing:
+#   series file: (unix timestamp, supply) for every backend entry, ascending by time
+#   daily file:  (date ordinal, supply at the last entry of that UTC day), ascending
+RECORD = struct.Struct("<dd")
+
+
+def _number(value):
+    return int(value) if value.is_integer() else value
+
+
+class MappedPairs:
+    """Append-only file of float64 pairs, read through a memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a+b")
+        # Drop a torn trailing record left by a crash mid-append
+        size = os.path.getsize(path)
+        if size % RECORD.size:
+            self.file.truncate(size - size % RECORD.size)
+        self.map = None
+        self.values = self.keys = self.data = None
+        self._remap()
+
+    def _release(self):
+        # The map can only be closed once no views into it are left
+        for view in (self.keys, self.data, self.values):
+            if view is not None:
+                view.release()
+        self.values = self.keys = self.data = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def _remap(self):
+        self._release()
+        self.file.flush()
+        size = os.path.getsize(self.path)
+        if size:
+            self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+            self.values = memoryview(self.map).cast("d")
+        else:
+            self.values = memoryview(b"").cast("d")
+        self.keys = self.values[0::2]
+        self.data = self.values[1::2]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def last(self):
+        if not len(self):
+            return None
+        return self.keys[-1], self.data[-1]
+
+    def append(self, pairs, replace_last=False):
+        """Append (key, value) pairs; replace_last overwrites the final record first."""
+        replace_last = replace_last and len(self) > 0
+        self._release()
+        if replace_last:
+            self.file.truncate(os.path.getsize(self.path) - RECORD.size)
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(b"".join(RECORD.pack(key, value) for key, value in pairs))
+        self._remap()
+
+    def find(self, key):
+        """Index of key, or None if it is not stored."""
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def close(self):
+        self._release()
+        self.file.close()
+
+
+class SupplySeries:
+    """Supply history kept locally, independent of the backend's stats window.
+
+    sync() appends only entries newer than the last stored timestamp and
+    keeps the daily-close rollup up to date, so burn queries read one
+    value per day straight from the mapped file and keep working while the
+    backend is down. Exposes the same supply_on()/current_supply() lookups
+    as SupplyHistory.
+
+    The series is written before the rollup, so a crash in between leaves
+    days only the series has. Opening and every sync recompute the rollup
+    from its last day onward out of the series, which fills such a gap.
+    """
+
+    def __init__(self, series_path, daily_path):
+        self.series = MappedPairs(series_path)
+        self.daily = MappedPairs(daily_path)
+        self._rebuild_rollup_tail()
+
+    def __len__(self):
+        return len(self.daily)
+
+    def sync(self, records):
+        """Append records (objects with dt and token_supply) newer than the stored series.
+
+        Returns:
+            The number of appended entries
+        """
+        last = self.series.last()
+        last_ts = last[0] if last else float("-inf")
+        new = sorted(
+            (r.dt.timestamp(), float(r.token_supply))
+            for r in records
+            if r.dt.timestamp() > last_ts
+        )
+        if new:
+            self.series.append(new)
+        self._rebuild_rollup_tail()
+        return len(new)
+
+    def _rebuild_rollup_tail(self):
+        """Recompute the daily closes from the rollup's last day onward out of the series."""
+        last_day = self.daily.last()
+        start = 0
+        if last_day is not None:
+            day = date.fromordinal(int(last_day[0]))
+            day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+            start = bisect_left(self.series.keys, day_start)
+
+        # The series is in time order, so the last entry seen for a day is its close
+        closes = {}
+        for ts, supply in zip(self.series.keys[start:], self.series.data[start:]):
+            closes[datetime.fromtimestamp(ts, timezone.utc).date().toordinal()] = supply
+        tail = sorted(closes.items())
+        if not tail or (last_day is not None and tail == [last_day]):
+            return
+        replace_last = last_day is not None and tail[0][0] == last_day[0]
+        self.daily.append(tail, replace_last=replace_last)
+
+    def covers(self, dt):
+        """True if both the series and its daily rollup reach dt."""
+        last = self.series.last()
+        last_day = self.daily.last()
+        return (
+            last is not None and last_day is not None
+            and last[0] >= dt.timestamp() and last_day[0] >= dt.date().toordinal()
+        )
+
+    def supply_on(self, target_date):
+        """Supply at the last entry of target_date, or None if that day has no data."""
+        i = self.daily.find(target_date.toordinal())
+        if i is None:
+            return None
+        return _number(self.daily.data[i])
+
+    def daily_closes(self):
+        """Return (date ordinals, supplies) of the daily rollup as views into the mapped file.
+
+        The views are only valid until the next sync(), so copy them before awaiting.
+        """
+        return self.daily.keys, self.daily.data
+
+    def current_supply(self, today):
+        """The most recent stored supply (today's close when today has data)."""
+        last = self.series.last()
+        if last is None:
+            return None
+        return _number(last[1])
+
+    def first_date(self):
+        if not len(self.daily):
+            return None
+        return date.fromordinal(int(self.daily.keys[0]))
+
+    def close(self):
+        self.series.close()
+        self.daily.close()
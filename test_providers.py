@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Test the whale balance providers against a local stub JSON-RPC server."""
+
+import sys
+sys.path.insert(0, '.')
+
+import asyncio
+import httpx
+from aiohttp import web
+from balance_providers import JsonRpcBalanceProvider, FallbackBalanceProvider, BalanceProvider
+
+TOKEN = "0x18c11FD286C5EC11c3b683Caa813B77f5163A122"
+BALANCES = {
+    "0x4df1cc7459fd074cbc6aa8803cceaee561812fbe": 251_234_500000000000000000,
+    "0x000000000000000000000000000000000000dead": 311_603 * 10**18,
+}
+requests_seen = []
+
+
+async def stub_rpc(request):
+    """Answer eth_call balanceOf batches, in reverse order like some real nodes do."""
+    batch = await request.json()
+    requests_seen.append(len(batch))
+    responses = []
+    for call in batch:
+        params = call["params"][0]
+        assert params["to"] == TOKEN and params["data"].startswith("0x70a08231")
+        wallet = "0x" + params["data"][-40:]
+        if wallet not in BALANCES:
+            responses.append({"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": "boom"}})
+            continue
+        responses.append({"jsonrpc": "2.0", "id": call["id"], "result": hex(BALANCES[wallet])})
+    return web.json_response(list(reversed(responses)))
+
+
+class StaticProvider(BalanceProvider):
+    name = "static"
+
+    async def get_balances(self, wallets):
+        return {w: 42.0 for w in wallets}
+
+
+class IncompleteProvider(BalanceProvider):
+    name = "incomplete"
+
+
+async def main():
+    app = web.Application()
+    app.router.add_post("/", stub_rpc)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = httpx.AsyncClient()
+    rpc = JsonRpcBalanceProvider(f"http://127.0.0.1:{port}/", TOKEN, lambda: client)
+    unknown = "0x1111111111111111111111111111111111111111"
+
+    try:
+        print("Testing that an incomplete provider can't be created:")
+        try:
+            IncompleteProvider()
+        except TypeError as e:
+            print(f"  {e}")
+        else:
+            raise AssertionError("a provider without get_balances must not be constructible")
+
+        print("Testing batched balanceOf:")
+        balances = await rpc.get_balances(list(BALANCES) + [unknown])
+        print(f"  {balances}")
+        assert balances["0x4df1cc7459fd074cbc6aa8803cceaee561812fbe"] == 251_234.5
+        assert balances["0x000000000000000000000000000000000000dead"] == 311_603
+        assert balances[unknown] is None
+        assert requests_seen == [3], "all wallets should share one round trip"
+
+        print("Testing fallback fills only missing wallets:")
+        fallback = FallbackBalanceProvider([rpc, StaticProvider()])
+        balances = await fallback.get_balances(list(BALANCES) + [unknown])
+        print(f"  {balances}")
+        assert balances[unknown] == 42.0
+        assert balances["0x000000000000000000000000000000000000dead"] == 311_603
+
+        print("Testing fallback when the RPC endpoint is down:")
+        down = JsonRpcBalanceProvider("http://127.0.0.1:1/", TOKEN, lambda: client)
+        balances = await FallbackBalanceProvider([down, StaticProvider()]).get_balances([unknown])
+        print(f"  {balances}")
+        assert balances[unknown] == 42.0
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+    print("OK")
+
+
+asyncio.run(main())
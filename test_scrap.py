@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Test the browser pool's memory accounting and recycling without starting Firefox."""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import signal
+import subprocess
+import time
+from scrap import BrowserPool, BrowserSession, process_tree, vmrss_kb
+
+# A parent with two children that each hold ~50 MB, like Firefox and its content processes
+CHILD = "import time; x = bytearray(50 * 1024 * 1024); time.sleep(60)"
+PARENT = (
+    "import subprocess, sys, time; "
+    f"[subprocess.Popen([sys.executable, '-c', {CHILD!r}]) for _ in range(2)]; "
+    "time.sleep(60)"
+)
+
+
+class FakeDriver:
+    def __init__(self, pid):
+        self.capabilities = {"moz:processID": pid}
+        self.current_url = "about:blank"
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def fake_session(pid):
+    session = BrowserSession.__new__(BrowserSession)
+    session.driver = FakeDriver(pid)
+    session.uses = 0
+    session.broken = False
+    return session
+
+
+parent = subprocess.Popen([sys.executable, "-c", PARENT])
+try:
+    # Wait for both children to start and fill their buffers
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        tree = process_tree(parent.pid)
+        if len(tree) == 3 and all(vmrss_kb(pid) > 50 * 1024 for pid in tree[1:]):
+            break
+        time.sleep(0.1)
+
+    print("Testing the process tree walk:")
+    session = fake_session(parent.pid)
+    parent_mb = vmrss_kb(parent.pid) / 1024
+    print(f"  tree {tree}, parent {parent_mb:.0f} MB, whole tree {session.rss_mb():.0f} MB")
+    assert tree[0] == parent.pid and len(tree) == 3
+    assert session.rss_mb() > parent_mb + 100, "children must be counted"
+
+    print("Testing the recycle threshold:")
+    pool = BrowserPool(max_uses=50, max_rss_mb=parent_mb + 50)
+    pool.checkin(session)
+    assert session.driver.quit_called and pool.recycled == 1 and not pool.idle
+
+    # The same tree stays pooled under a limit it does not reach
+    roomy = fake_session(parent.pid)
+    pool = BrowserPool(max_uses=50, max_rss_mb=session.rss_mb() + 100)
+    pool.checkin(roomy)
+    assert not roomy.driver.quit_called and pool.idle == [roomy]
+    assert pool.checkout() is roomy
+
+    print("Testing a session whose Firefox is gone:")
+    assert fake_session(None).rss_mb() == 0
+finally:
+    for pid in process_tree(parent.pid)[1:]:
+        os.kill(pid, signal.SIGKILL)
+    parent.kill()
+    parent.wait()
+
+print("OK")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Test the game state stores: journal replay, torn-tail recovery and the JSON to SQLite import."""
+
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-storage")
+# gmud keeps its state files in the working directory
+os.chdir(tempfile.mkdtemp(prefix="gmud-test-storage-"))
+
+import asyncio
+import json
+import gmud
+from storage import JsonStore, SqliteStore
+
+
+def plain(data):
+    """data as it looks after a JSON round trip (tuples become lists)."""
+    return json.loads(json.dumps(data))
+
+
+def play(state):
+    state.record("init", boss="supply", user="Alice", supply=27_000_000)
+    state.record("attack", boss="supply", user="Bob", damage=1_500, supply=26_998_500)
+    state.record("miss", boss="supply", user="Alice", damage=0, supply=26_998_500)
+    state.record("init", boss="whale", user="Carol", supply=300_000.5)
+    state.record("whale_hit", boss="whale", user="Carol", damage=250.25, supply=299_750.25)
+
+
+async def main():
+    print("Testing journal replay:")
+    store = JsonStore("replay.json", "replay.jsonl")
+    state = gmud.GameState(store)
+    play(state)
+    expected, expected_seq = plain(state.data), state.seq
+    state.close()
+
+    reloaded = gmud.GameState(JsonStore("replay.json", "replay.jsonl"))
+    print(f"  seq {reloaded.seq}, players {sorted(reloaded.data['players'])}")
+    assert reloaded.seq == expected_seq and plain(reloaded.data) == expected
+
+    print("Testing snapshot plus journal tail:")
+    await reloaded.flush()
+    reloaded.record("attack", boss="supply", user="Dave", damage=700, supply=26_997_800)
+    expected, expected_seq = plain(reloaded.data), reloaded.seq
+    reloaded.close()
+    reloaded = gmud.GameState(JsonStore("replay.json", "replay.jsonl"))
+    assert reloaded.seq == expected_seq and plain(reloaded.data) == expected
+    reloaded.close()
+
+    print("Testing a torn journal tail:")
+    store = JsonStore("torn.json", "torn.jsonl")
+    state = gmud.GameState(store)
+    play(state)
+    state.close()
+    with open("torn.jsonl", "rb") as f:
+        lines = f.readlines()
+    # The state as it was before the last event
+    with open("before.jsonl", "wb") as f:
+        f.writelines(lines[:-1])
+    before = gmud.GameState(JsonStore("before.json", "before.jsonl"))
+    before.close()
+    # Crash in the middle of appending the last event
+    with open("torn.jsonl", "wb") as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:len(lines[-1]) // 2])
+
+    recovered = gmud.GameState(JsonStore("torn.json", "torn.jsonl"))
+    print(f"  seq {recovered.seq}, journal {os.path.getsize('torn.jsonl')} bytes")
+    assert recovered.seq == before.seq == len(lines) - 1
+    assert plain(recovered.data) == plain(before.data)
+    assert os.path.getsize("torn.jsonl") == sum(len(line) for line in lines[:-1])
+
+    # New events start on a clean line and survive the next reload
+    recovered.record("attack", boss="supply", user="Eve", damage=10, supply=26_998_490)
+    expected = plain(recovered.data)
+    recovered.close()
+    reloaded = gmud.GameState(JsonStore("torn.json", "torn.jsonl"))
+    assert reloaded.seq == len(lines) and plain(reloaded.data) == expected
+    reloaded.close()
+
+    print("Testing the JSON to SQLite import:")
+    gmud.STORAGE_BACKEND = "json"
+    state = gmud.GameState(gmud.create_store())
+    play(state)
+    await state.flush()
+    state.record("attack", boss="supply", user="Frank", damage=5, supply=26_998_495)
+    expected, expected_seq = plain(state.data), state.seq
+    state.close()
+
+    gmud.STORAGE_BACKEND = "sqlite"
+    migrated = gmud.GameState(gmud.create_store())
+    events = list(migrated.store.read_events(0))
+    print(f"  seq {migrated.seq}, {len(events)} events, players {sorted(migrated.data['players'])}")
+    assert isinstance(migrated.store, SqliteStore)
+    assert migrated.seq == expected_seq and len(events) == expected_seq
+    assert plain(migrated.data) == expected
+    migrated.record("attack", boss="supply", user="Frank", damage=1, supply=26_998_494)
+    expected = plain(migrated.data)
+    await migrated.flush()
+    migrated.close()
+
+    # A second start reads SQLite only and does not import again
+    reopened = gmud.GameState(gmud.create_store())
+    assert reopened.seq == expected_seq + 1 and plain(reopened.data) == expected
+    assert len(list(reopened.store.read_events(0))) == expected_seq + 1
+    reopened.close()
+
+    print("OK")
+
+
+asyncio.run(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test the memory-mapped supply series: sync, daily rollup and torn-record recovery."""
+
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+from supply_series import SupplySeries, MappedPairs, RECORD
+
+work_dir = tempfile.mkdtemp(prefix="gmud-test-series-")
+series_path = os.path.join(work_dir, "series.bin")
+daily_path = os.path.join(work_dir, "daily.bin")
+
+
+def record(dt, supply):
+    return SimpleNamespace(dt=dt, token_supply=supply)
+
+
+start = datetime(2025, 1, 1, 6, tzinfo=timezone.utc)
+records = [record(start + timedelta(hours=12 * i), 27_000_000 - 1_000 * i) for i in range(6)]
+
+print("Testing sync and the daily rollup:")
+series = SupplySeries(series_path, daily_path)
+assert series.sync(records) == 6
+assert series.sync(records) == 0, "entries already stored must not be appended again"
+print(f"  {len(series.series)} entries, {len(series)} days")
+assert len(series.series) == 6 and len(series) == 3
+assert series.supply_on(start.date()) == 26_999_000
+assert series.current_supply(start.date()) == 26_995_000
+series.close()
+
+print("Testing a torn trailing record:")
+with open(series_path, "ab") as f:
+    f.write(RECORD.pack(9e9, 1.0)[:RECORD.size // 2])  # Crash mid-append
+pairs = MappedPairs(series_path)
+print(f"  {len(pairs)} records, {os.path.getsize(series_path)} bytes")
+assert len(pairs) == 6 and os.path.getsize(series_path) == 6 * RECORD.size
+assert pairs.last() == (records[-1].dt.timestamp(), 26_995_000)
+pairs.close()
+
+# The next sync appends on a record boundary
+series = SupplySeries(series_path, daily_path)
+assert series.sync([record(start + timedelta(days=3), 26_990_000)]) == 1
+assert len(series.series) == 7 and series.current_supply(None) == 26_990_000
+assert series.supply_on((start + timedelta(days=3)).date()) == 26_990_000
+series.close()
+
+print("Testing a crash between the series and rollup writes:")
+series = SupplySeries(series_path, daily_path)
+crash_records = [record(start + timedelta(days=4 + i), 26_980_000 - 1_000 * i) for i in range(2)]
+append_daily = series.daily.append
+
+
+def crash(pairs, replace_last=False):
+    raise OSError("disk full")
+
+
+series.daily.append = crash
+try:
+    series.sync(crash_records)
+    raise AssertionError("the crash must propagate")
+except OSError:
+    pass
+series.daily.append = append_daily
+assert len(series.series) == 9 and len(series) == 4
+assert not series.covers(crash_records[-1].dt), "the rollup is behind the series"
+assert series.supply_on(crash_records[0].dt.date()) is None
+
+# A resync has nothing new for the series but still fills the rollup
+assert series.sync(crash_records) == 0
+print(f"  {len(series.series)} entries, {len(series)} days")
+assert len(series) == 6 and series.covers(crash_records[-1].dt)
+assert series.supply_on(crash_records[0].dt.date()) == 26_980_000
+assert series.supply_on(crash_records[1].dt.date()) == 26_979_000
+series.close()
+
+# Reopening fills the gap too
+series = SupplySeries(series_path, daily_path)
+more = [record(start + timedelta(days=6), 26_970_000)]
+series.daily.append = crash
+try:
+    series.sync(more)
+except OSError:
+    pass
+series.close()
+series = SupplySeries(series_path, daily_path)
+assert len(series) == 7 and series.supply_on(more[0].dt.date()) == 26_970_000
+series.close()
+
+print("OK")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test the supply backend's circuit breaker and hedged requests against a mock transport."""
+
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-upstream")
+os.environ.pop("SUPPLY_HEDGE", None)
+os.chdir(tempfile.mkdtemp(prefix="gmud-test-upstream-"))
+
+import asyncio
+import time
+import httpx
+import gmud
+import metrics
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+URL = "http://backend.test/stats"
+
+
+class Backend:
+    """Answers each request after the next scripted (delay, status), recording what happened to it."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.started = []
+        self.cancelled = []
+
+    async def handle(self, request):
+        n = len(self.started)
+        delay, status = self.script[n]
+        self.started.append(n)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        return httpx.Response(status, json={"request": n})
+
+
+def counter(name):
+    return metrics.counters.get((name, ()), 0)
+
+
+def check_breaker():
+    print("Testing circuit breaker transitions:")
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_ses=0.1)
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CLOSED, "one failure is under the threshold"
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert 0 < breaker.retry_in() <= 0.1
+    print(f"  open, retry in {breaker.retry_in():.2f}s")
+
+    time.sleep(0.12)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow(), "only one trial call at a time"
+    breaker.record_failure()
+    assert breaker.state == OPEN, "a failed trial opens the circuit again"
+
+    time.sleep(0.12)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.allow()
+    print(f"  closed again, {metrics.counters[('circuit_opened_total', (('circuit', 'test'),))]} openings")
+
+
+async def check_hedging():
+    assert gmud.SUPPLY_HEDGE_ENABLED is False, "hedging must be opt-in"
+    gmud.SUPPLY_HEDGE_ENABLED = True
+    gmud.SUPPLY_HEDGE_DEFAULT_SES = 0.05
+
+    print("Testing a fast first request (no hedge):")
+    backend = Backend([(0, 200)])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handle)) as client:
+        resp = await gmud.hedged_get(client, URL)
+    assert resp.json() == {"request": 0} and backend.started == [0]
+    assert counter("supply_fetch_hedged_total") == 0
+
+    print("Testing a hedge that beats a slow first request:")
+    backend = Backend([(5, 200), (0.01, 200)])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handle)) as client:
+        start = time.perf_counter()
+        resp = await gmud.hedged_get(client, URL)
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0)  # Let the loser see its cancellation
+    print(f"  answered by request {resp.json()['request']} in {elapsed:.2f}s, cancelled {backend.cancelled}")
+    assert resp.json() == {"request": 1} and elapsed < 1
+    assert backend.cancelled == [0], "the slow request must be cancelled"
+    assert counter("supply_fetch_hedged_total") == 1 and counter("supply_fetch_hedge_wins_total") == 1
+
+    print("Testing both requests failing:")
+    backend = Backend([(0.1, 503), (0.01, 500)])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handle)) as client:
+        try:
+            await gmud.hedged_get(client, URL)
+        except httpx.HTTPStatusError as e:
+            print(f"  {e.response.status_code}")
+            assert e.response.status_code == 500, "the first error seen is raised"
+        else:
+            raise AssertionError("both requests failed, so hedged_get must raise")
+    assert backend.started == [0, 1] and not backend.cancelled
+
+    print("Testing hedging switched off:")
+    gmud.SUPPLY_HEDGE_ENABLED = False
+    backend = Backend([(0.1, 200)])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handle)) as client:
+        resp = await gmud.hedged_get(client, URL)
+    assert resp.json() == {"request": 0} and backend.started == [0]
+
+
+check_breaker()
+asyncio.run(check_hedging())
+print("OK")